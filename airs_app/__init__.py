@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+AI Runtime Security test application as one package.
+
+The four runtime_test_app*.py variants are now profiles of the same code:
+
+    standard   - Flask, non-streaming (runtime_test_app.py, runtime_test_app_direct_api.py)
+    streaming  - Flask, streaming formats, pacing, stream guard (runtime_test_app_streaming.py)
+    cloudrun   - streaming on $PORT 8080 with / as health check (runtime_test_app_streaming_cloudrun.py)
+    async      - aiohttp, streaming (runtime_test_app_async.py)
+
+Pick one with AIRS_APP_PROFILE or by name:
+
+    from airs_app import create_app
+    app = create_app("standard")
+
+Only the selected profile's server and streaming modules are imported, so a
+non-streaming Flask deployment never loads aiohttp or the stream encoders.
+Scanning lives in airs_app.scanner and is shared by all profiles and
+scan_corpus.py. Startup is timed phase by phase (see airs_app.startup).
+"""
+
+from . import startup
+from .config import PROFILES, get_profile
+
+startup.mark("interpreter")
+
+__all__ = ["PROFILES", "create_app", "get_profile", "run"]
+
+
+def create_app(profile=None):
+    """Build the WSGI (Flask) or aiohttp application for a profile."""
+    profile = get_profile(profile)
+    if profile.server == "aiohttp":
+        # Prewarmed and marked ready on the event loop (see aiohttp_app.py)
+        from .aiohttp_app import create_app as factory
+    else:
+        # AIRS_FAST_START: connect to AIRS while the server modules import
+        startup.start_prewarm()
+        from .flask_app import create_app as factory
+    startup.mark("modules")
+    app = factory(profile)
+    startup.mark("app")
+    if profile.server != "aiohttp":
+        startup.wait_for_prewarm()
+        startup.ready()
+    return app
+
+
+def run(profile=None, app=None):
+    """Print the startup banner and run the development server."""
+    from .config import API_KEY, RUNTIME_API_URL, USE_REAL_LLM
+    from .llm_backend import LLM_API_URL
+
+    profile = get_profile(profile)
+    if app is None:
+        app = create_app(profile)
+    port = profile.port
+
+    print("="*60)
+    print(f"🔒 {profile.title}")
+    print("="*60)
+    print(f"App profile: {profile.name}")
+    print(f"Profile: {profile.security_profile}")
+    print(f"API Key: {API_KEY[:10]}...")
+    print(f"API URL: {RUNTIME_API_URL}")
+    print(f"LLM: {LLM_API_URL if USE_REAL_LLM else 'Mock responses'}")
+    print(f"Port: {port}")
+    print("="*60)
+    print(f"\n🚀 Starting server on http://localhost:{port}")
+    print("📋 Endpoints:")
+    print(f"   • POST /v1/chat/completions ({'streaming & non-streaming' if profile.streaming else 'non-streaming'})")
+    print("   • GET  /health")
+    print("   • GET  /metrics (Prometheus)")
+    if profile.root_health:
+        print("   • GET  / (health check)")
+    if profile.streaming:
+        print("\n📡 Streaming formats (use ?format=<type>):")
+        print("   • openai    - OpenAI-compatible SSE (default)")
+        print("   • textdelta - Text-delta format")
+        print("   • ndjson    - Newline-delimited JSON")
+        print("   • simple    - Simple JSON stream")
+        print("   • anthropic - Anthropic Messages events")
+        print("   • gemini    - Gemini streamGenerateContent SSE")
+        print("\n⏱️  Pacing (use &pace=<spec>): none (default), fixed:<ms>, tps:<n>, replay")
+    print(f"\n💚 Health check: http://localhost:{port}/health\n")
+
+    if profile.server == "aiohttp":
+        from aiohttp import web
+        web.run_app(app, host="0.0.0.0", port=port, print=None)
+    else:
+        app.run(host="0.0.0.0", port=port, debug=profile.debug)
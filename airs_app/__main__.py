@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Run a profile on the development server.
+
+Usage:
+    python -m airs_app [standard|streaming|cloudrun|async]
+"""
+
+import sys
+
+from . import run
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
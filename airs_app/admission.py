@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Admission control for calls to the Runtime Security API and the LLM.
+
+Nothing used to limit how many scans or LLM calls were in flight, so a Red
+Team burst either parked worker threads on 30 s timeouts or ran into the
+upstream's rate limit and failed there. Each upstream now has a limiter:
+
+    - at most N calls in flight; further callers wait in a bounded queue
+    - a token bucket (calls per second plus burst) sized to the upstream's
+      quota, e.g. the AIRS API key's scans-per-second allowance
+    - a maximum wait per call; a caller is shed as soon as the queue is full,
+      its expected wait (queue position x recent call time) or its token
+      wait would exceed that, instead of waiting and failing anyway
+
+A shed call raises Overloaded, which the apps turn into a fast 503 (queue)
+or 429 (rate) with a Retry-After header. Queue depth, calls in flight and
+shed counts are exposed in /health under "admission" and on /metrics.
+
+Verdict cache hits never reach a limiter. With AIRS_BATCH=true each scan
+still takes its own slot and token.
+
+Limits are per process: threads and coroutines in one process share each
+limiter, but every gunicorn worker has its own. serve.py exports the worker
+count as WEB_CONCURRENCY, and <P>_CONCURRENCY, <P>_RATE and <P>_BURST are
+divided by it, so they stay the totals for the whole deployment.
+
+Scans for an extra AIRS security profile (see scanner.py) first pass that
+profile's own limiter, "profile:<name>", and then the shared scan limiter,
+so one red-team target cannot use up the whole API key's quota. Any
+AIRS_PROFILE_* setting can be given per profile with the profile name
+upper-cased and non-alphanumerics as "_", e.g. AIRS_PROFILE_RATE_RED_TEAM_A.
+
+Configuration (environment variables; <P> is AIRS_SCAN, LLM or AIRS_PROFILE):
+    AIRS_ADMISSION       - "false" to turn admission control off (default true)
+    <P>_CONCURRENCY      - calls in flight, 0 = unlimited (default 32)
+    <P>_QUEUE            - callers allowed to wait for a slot, per worker (default 128)
+    <P>_MAX_WAIT_MS      - longest a call may wait for a slot or token (default 2000)
+    <P>_RATE             - calls per second, 0 = unlimited (default 0)
+    <P>_BURST            - token bucket size (default: one second of RATE)
+    WEB_CONCURRENCY      - worker processes sharing the limits above (default 1)
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from .metrics import Counter, Gauge, METRICS_ENABLED
+
+ADMISSION_ENABLED = os.getenv("AIRS_ADMISSION", "true").lower() == "true"
+
+# Env prefix per upstream
+UPSTREAMS = {"scan": "AIRS_SCAN", "llm": "LLM", "profile": "AIRS_PROFILE"}
+
+SHED_TOTAL = Counter("airs_admission_shed_total", "Calls shed by admission control.",
+                     ("upstream", "reason"))
+QUEUE_DEPTH = Gauge("airs_admission_queue_depth", "Calls waiting for an upstream slot.",
+                    ("upstream",))
+IN_FLIGHT = Gauge("airs_admission_in_flight", "Calls holding an upstream slot.", ("upstream",))
+
+
+class Overloaded(Exception):
+    """A call was shed; status is 503 (no slot in time) or 429 (rate limit)."""
+
+    def __init__(self, upstream, reason, retry_after):
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = 429 if reason == "rate" else 503
+        super().__init__(f"{upstream} overloaded ({reason}), retry after {self.retry_after_header}s")
+
+    @property
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def _config(name):
+    upstream, _, tenant = name.partition(":")
+    prefix = UPSTREAMS[upstream]
+    suffix = re.sub(r"[^A-Z0-9]", "_", tenant.upper())
+
+    def setting(key, default):
+        if suffix and f"{prefix}_{key}_{suffix}" in os.environ:
+            return os.environ[f"{prefix}_{key}_{suffix}"]
+        return os.getenv(f"{prefix}_{key}", default)
+
+    # Each worker process gets its share of the deployment-wide limits
+    workers = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    concurrency = int(setting("CONCURRENCY", "32"))
+    if concurrency > 0:
+        concurrency = max(concurrency // workers, 1)
+    rate = float(setting("RATE", "0")) / workers
+    burst = float(setting("BURST", "0")) / workers
+    return {
+        "concurrency": concurrency,
+        "queue": int(setting("QUEUE", "128")),
+        "max_wait": float(setting("MAX_WAIT_MS", "2000")) / 1000,
+        "rate": rate,
+        "burst": max(burst, 1.0) if burst else max(rate, 1.0),
+    }
+
+
+class _Limiter:
+    """Counters, token bucket and shedding decisions."""
+
+    def __init__(self, name, concurrency, queue, max_wait, rate=0.0, burst=1.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.max_wait = max_wait
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "deadline": 0, "rate": 0}
+        self.wait_ms_max = 0.0
+        self._hold_ewma = 0.0
+
+    def _shed(self, reason, retry_after):
+        with self._lock:
+            self.shed[reason] += 1
+        if METRICS_ENABLED:
+            SHED_TOTAL.inc(upstream=self.name, reason=reason)
+        return Overloaded(self.name, "rate" if reason == "rate" else "queue", retry_after)
+
+    def _reserve_token(self, budget):
+        """Seconds to wait for a rate token (reserved now), or raise Overloaded.
+
+        Called once the call holds a slot, so a call shed from the queue
+        never spends a token.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait <= budget:
+                self._tokens -= 1
+                return wait
+        raise self._shed("rate", wait)
+
+    def _try_enter_queue(self, budget):
+        """Take a slot now (True), join the queue (False) or raise Overloaded."""
+        with self._lock:
+            if self.concurrency <= 0 or (self.active < self.concurrency and not self.waiting):
+                self.active += 1
+                self.admitted += 1
+                return True
+            full = self.waiting >= self.queue
+            # Calls ahead of us drain about `concurrency` at a time
+            expected = math.ceil((self.waiting + 1) / self.concurrency) * self._hold_ewma
+            if not full and expected <= budget:
+                self.waiting += 1
+                return False
+        if full:
+            raise self._shed("queue_full", expected or budget)
+        raise self._shed("deadline", expected)
+
+    def _left_queue(self, admitted, waited):
+        with self._lock:
+            self.waiting -= 1
+            if admitted:
+                self.admitted += 1
+                self.wait_ms_max = max(self.wait_ms_max, waited * 1000)
+
+    def _release(self, held):
+        """Free a slot; held is None when the call gave it back unused."""
+        with self._lock:
+            self.active -= 1
+            if held is None:
+                self.admitted -= 1
+            else:
+                self._hold_ewma = held if not self._hold_ewma else 0.8 * self._hold_ewma + 0.2 * held
+
+    def _gauges(self):
+        if METRICS_ENABLED:
+            QUEUE_DEPTH.set(self.waiting, upstream=self.name)
+            IN_FLIGHT.set(self.active, upstream=self.name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "in_flight": self.active,
+                "queue_depth": self.waiting,
+                "queue_max": self.queue,
+                "max_wait_ms": round(self.max_wait * 1000),
+                "rate": self.rate,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "wait_ms_max": round(self.wait_ms_max, 1),
+                "call_ms_avg": round(self._hold_ewma * 1000, 1),
+            }
+
+
+class Slot:
+    """One admitted call; release() is idempotent so stream cleanup can race."""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._start = time.monotonic()
+        self._once = threading.Lock()
+
+    def release(self):
+        if self._limiter is None or not self._once.acquire(blocking=False):
+            return
+        self._limiter._release(time.monotonic() - self._start)
+        self._limiter._gauges()
+
+
+class Limiter(_Limiter):
+    """Admission for threaded callers and, through .asynchronous, coroutines.
+
+    Both kinds of caller share the one in-flight count, queue and token
+    bucket, so in the aiohttp app the scan queue threads and the request
+    coroutines draw from the same budget.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition(threading.Lock())
+        self._freed = None  # asyncio.Condition, made on the first async wait
+        self._loop = None
+        self._async_waiting = 0  # coroutines parked on _freed
+        self.asynchronous = AsyncLimiter(self)
+
+    def _take_slot(self):
+        with self._lock:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+        return False
+
+    def _token_for_slot(self, start):
+        """Reserve a token for an admitted call; gives the slot back if shed."""
+        try:
+            return self._reserve_token(self.max_wait - (time.monotonic() - start))
+        except Overloaded:
+            self._release(None)
+            self._gauges()
+            raise
+
+    def acquire(self):
+        """Wait for a slot and then a token; returns a Slot or raises Overloaded."""
+        start = time.monotonic()
+        if not self._try_enter_queue(self.max_wait):
+            self._gauges()
+            deadline = start + self.max_wait
+            admitted = False
+            with self._cond:
+                while True:
+                    admitted = self._take_slot()
+                    remaining = deadline - time.monotonic()
+                    if admitted or remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self._left_queue(admitted, time.monotonic() - start)
+            if not admitted:
+                self._gauges()
+                raise self._shed("deadline", self._hold_ewma or self.max_wait)
+        delay = self._token_for_slot(start)
+        if delay:
+            time.sleep(delay)
+        self._gauges()
+        return Slot(self)
+
+    async def aacquire(self):
+        import asyncio  # only the aiohttp profile pays for loading asyncio
+
+        start = time.monotonic()
+        if not self._try_enter_queue(self.max_wait):
+            self._gauges()
+            if self._freed is None:
+                self._loop = asyncio.get_running_loop()
+                self._freed = asyncio.Condition()
+            admitted = False
+            self._async_waiting += 1
+            try:
+                async with self._freed:
+                    admitted = await asyncio.wait_for(
+                        self._freed.wait_for(self._take_slot),
+                        max(start + self.max_wait - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._async_waiting -= 1
+            self._left_queue(admitted, time.monotonic() - start)
+            if not admitted:
+                self._gauges()
+                raise self._shed("deadline", self._hold_ewma or self.max_wait)
+        delay = self._token_for_slot(start)
+        if delay:
+            await asyncio.sleep(delay)
+        self._gauges()
+        return Slot(self)
+
+    def _release(self, held):
+        super()._release(held)
+        with self._cond:
+            self._cond.notify()
+        # Released from a thread or the loop itself; wake a waiting coroutine
+        # too. A waiter that registers after this check tests for a free
+        # slot before it parks, so it cannot miss this release.
+        if self._async_waiting and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake_coroutine)
+
+    def _wake_coroutine(self):
+        self._loop.create_task(self._notify())
+
+    async def _notify(self):
+        async with self._freed:
+            self._freed.notify()
+
+    @contextmanager
+    def slot(self):
+        slot = self.acquire()
+        try:
+            yield
+        finally:
+            slot.release()
+
+
+class AsyncLimiter:
+    """A Limiter as seen from coroutines on one event loop (the aiohttp app)."""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+
+    async def acquire(self):
+        return await self._limiter.aacquire()
+
+    @asynccontextmanager
+    async def slot(self):
+        slot = await self.acquire()
+        try:
+            yield
+        finally:
+            slot.release()
+
+    def stats(self):
+        return self._limiter.stats()
+
+
+class _AsyncUnlimited:
+    async def acquire(self):
+        return Slot(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        yield
+
+
+class _Unlimited:
+    """Stand-in when admission control is off."""
+
+    asynchronous = _AsyncUnlimited()
+
+    def acquire(self):
+        return Slot(None)
+
+    @contextmanager
+    def slot(self):
+        yield
+
+    def stats(self):
+        return {"enabled": False}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, asynchronous=False):
+    """Return the process-wide limiter for an upstream ("scan", "llm" or "profile:<name>").
+
+    Threads and coroutines get two faces of the same limiter.
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = Limiter(name, **_config(name)) if ADMISSION_ENABLED else _Unlimited()
+    return limiter.asynchronous if asynchronous else limiter
+
+
+def admission_stats():
+    if not ADMISSION_ENABLED:
+        return {"enabled": False}
+    return {name: limiter.stats() for name, limiter in sorted(_limiters.items())}
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+aiohttp server for the async profile.
+
+Same endpoints and streaming formats as the streaming profile, but the
+prompt scan, LLM call and response scan are awaited instead of blocking
+a worker thread. A slow Runtime Security scan only parks a coroutine, so a
+single process can hold thousands of concurrent Red Team connections.
+
+Requires: pip install aiohttp
+"""
+
+import asyncio
+import os
+
+import aiohttp
+from aiohttp import web
+
+from .admission import Overloaded, admission_stats
+from .circuit_breaker import breaker_stats
+from .hedging import hedge_requested, hedge_stats
+from .config import (
+    AIRS_API_URL, BLOCK_STATUS_CODE, MODEL_NAME, RUNTIME_API_URL, USE_REAL_LLM, require_api_key
+)
+from .llm import aget_llm_response
+from .llm_backend import LLM_POOL_MAXSIZE, LLM_TIMEOUT, llm_stats
+from .metrics import CONTENT_TYPE, aiohttp_middleware, register_stats, render_metrics, time_stage
+from .pacing import pacer_for_request
+from .request_log import TRACE_HEADER, log_event, log_stats, log_verdict, trace_id, trace_middleware
+from .responses import BLOCKED_PROMPT, BLOCKED_RESPONSE, completion_body, latest_user_prompt
+from .scan_batcher import batch_stats
+from .scan_cache import cache_allowed, cache_stats
+from .scan_queue import ALERT_ONLY_PROFILES, queue_stats, start_workers
+from .scanner import (
+    UnknownProfile, ascan_conversation, ascan_with_runtime_security, detected_threats, profile_requested, profile_stats,
+    set_security_profile
+)
+from .speculative import SAVED_MS_HEADER, AsyncSpeculation, speculation_requested, speculative_stats
+from .startup import aprewarm, first_request, ready, startup_stats
+from .stream_formats import astream_frames, available_formats, get_stream_format
+
+# Same knob as the requests-based pool in airs_session.py
+POOL_MAXSIZE = int(os.getenv("AIRS_POOL_MAXSIZE", "32"))
+
+AIRS_SESSION = web.AppKey("airs_session", aiohttp.ClientSession)
+LLM_SESSION = web.AppKey("llm_session", aiohttp.ClientSession)
+APP_PROFILE = web.AppKey("app_profile", object)
+PROFILE_SESSIONS = web.AppKey("profile_sessions", dict)
+
+
+async def stream_response(request, content, format_cls, pacer=None, status=200, headers=None):
+    """Write a streamed body frame by frame without holding a thread."""
+    resp = web.StreamResponse(status=status, headers=headers)
+    resp.headers[TRACE_HEADER] = trace_id()
+    resp.content_type = format_cls.mimetype
+    await resp.prepare(request)
+    async for frame in astream_frames(format_cls(MODEL_NAME), content, pacer):
+        await resp.write(frame)
+    await resp.write_eof()
+    return resp
+
+
+def _scan_session(app, airs_profile):
+    """The AIRS connection pool for a security profile; each extra one gets its own."""
+    if airs_profile is None:
+        return app[AIRS_SESSION]
+    sessions = app[PROFILE_SESSIONS]
+    if airs_profile not in sessions:
+        sessions[airs_profile] = _airs_client_session()
+    return sessions[airs_profile]
+
+
+async def chat_completions(request):
+    """
+    OpenAI-compatible endpoint with Runtime Security scanning.
+    Supports both streaming and non-streaming modes.
+    The AIRS security profile comes from the path, X-AIRS-Profile or the app profile.
+    """
+    try:
+        airs_profile = profile_requested(request.headers, request.match_info.get("security_profile"))
+        with time_stage("json_parse"):
+            data = await request.json()
+        stream = data.get("stream", False)
+        stream_format = format_cls = pacer = None
+        if stream:
+            stream_format = request.query.get("format", "openai")  # see stream_formats.py
+            format_cls = get_stream_format(stream_format)
+            try:
+                pacer = pacer_for_request(request.query)  # none, fixed:<ms>, tps:<n>, replay
+            except (ValueError, OSError) as e:
+                return web.json_response({"error": f"Invalid pace: {e}"}, status=400)
+        session = _scan_session(request.app, airs_profile)
+        use_cache = cache_allowed(request.headers)
+        speculate = speculation_requested(request.headers)
+        hedge_requested(request.headers)  # X-AIRS-Hedge, for this request's scans
+
+        messages = data.get("messages", [])
+        # The LLM gets the whole conversation; the response scan pairs
+        # its answer with the turn it answers
+        prompt = latest_user_prompt(messages)
+        if not prompt:
+            return web.json_response({"error": "No user message found"}, status=400)
+
+        log_event("request.received", prompt=prompt[:100], stream=stream, format=stream_format,
+                  security_profile=airs_profile or request.app[APP_PROFILE].security_profile)
+
+        # Start the LLM call now so it overlaps the prompt scan (opt-in)
+        speculation = AsyncSpeculation(aget_llm_response(request.app[LLM_SESSION], messages)) if speculate else None
+
+        # Scan the conversation with Runtime Security (only turns not seen before)
+        try:
+            scan_result = await ascan_conversation(session, messages, use_cache=use_cache, profile=airs_profile)
+        except BaseException:
+            # Shed, failed or cancelled scan: the speculative generation is never used
+            if speculation:
+                speculation.discard()
+            raise
+        category = scan_result.get("category", "unknown")
+        action = scan_result.get("action", "unknown")
+        log_verdict("prompt", scan_result, detected=detected_threats(scan_result, "prompt_detected"))
+
+        # Block malicious prompts
+        if category == "malicious" or action == "block":
+            log_event("request.blocked", "warning", stage="prompt")
+            if speculation:
+                speculation.discard()
+            if stream:
+                return await stream_response(request, BLOCKED_PROMPT, format_cls, pacer,
+                                             status=BLOCK_STATUS_CODE)
+            with time_stage("serialize"):
+                return web.json_response(completion_body(prompt, BLOCKED_PROMPT, 15),
+                                         status=BLOCK_STATUS_CODE)
+
+        # Allow safe prompts
+        log_event("request.allowed", "debug")
+        if speculation:
+            llm_response = await speculation.result()
+            log_event("speculation.used", "debug", saved_ms=round(speculation.saved_ms, 1))
+        else:
+            llm_response = await aget_llm_response(request.app[LLM_SESSION], messages)
+        extra_headers = {SAVED_MS_HEADER: f"{speculation.saved_ms:.1f}"} if speculation else {}
+
+        # Scan response
+        response_scan = await ascan_with_runtime_security(session, prompt, llm_response,
+                                                          use_cache=use_cache, profile=airs_profile,
+                                                          prompt_verdict=scan_result)
+        response_detected = detected_threats(response_scan, "response_detected")
+        log_verdict("response", response_scan, detected=response_detected)
+        failed_closed = response_scan.get("category") == "error"  # AIRS_FAIL_MODE=closed
+        if (response_detected or failed_closed) and response_scan.get("action") == "block":
+            log_event("request.blocked", "warning", stage="response")
+            llm_response = BLOCKED_RESPONSE
+
+        # Return response
+        if stream:
+            log_event("stream.start", "debug", format=stream_format)
+            return await stream_response(request, llm_response, format_cls, pacer, headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',
+                **extra_headers
+            })
+
+        with time_stage("serialize"):
+            return web.json_response(completion_body(prompt, llm_response), headers=extra_headers)
+
+    except (ConnectionResetError, asyncio.CancelledError):
+        # Client went away mid-stream; nothing left to answer
+        raise
+    except UnknownProfile as e:
+        log_event("request.rejected", "warning", security_profile=e.name)
+        return web.json_response({"error": str(e)}, status=e.status)
+    except Overloaded as e:
+        log_event("request.shed", "warning", upstream=e.upstream, reason=e.reason)
+        return web.json_response({"error": str(e)}, status=e.status,
+                                 headers={"Retry-After": e.retry_after_header})
+    except Exception as e:
+        import traceback
+        log_event("request.error", "error", error=str(e), traceback=traceback.format_exc())
+        return web.json_response({"error": str(e)}, status=500)
+
+
+async def health(request):
+    """Health check endpoint."""
+    profile = request.app[APP_PROFILE]
+    return web.json_response({
+        "status": "healthy",
+        "runtime_security": "enabled (direct API, async)",
+        "app_profile": profile.name,
+        "profile": profile.security_profile,
+        "llm": "mock" if not USE_REAL_LLM else "openai",
+        "llm_upstream": llm_stats(),
+        "api_url": RUNTIME_API_URL,
+        "streaming": f"supported ({', '.join(available_formats())})",
+        "connection_pool": {"pool_maxsize": request.app[AIRS_SESSION].connector.limit},
+        "verdict_cache": cache_stats(),
+        "profiles": profile_stats(),
+        "scan_queue": queue_stats(),
+        "speculative": speculative_stats(),
+        "batching": batch_stats(),
+        "logging": log_stats(),
+        "admission": admission_stats(),
+        "circuit_breaker": breaker_stats(),
+        "hedging": hedge_stats(),
+        "startup": startup_stats()
+    })
+
+
+@web.middleware
+async def _first_request(request, handler):
+    first_request()
+    return await handler(request)
+
+
+async def metrics(request):
+    """Prometheus metrics."""
+    return web.Response(body=render_metrics().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+def _airs_client_session():
+    # ssl=False mirrors verify=False in the requests-based apps (testing only!)
+    connector = aiohttp.TCPConnector(limit=POOL_MAXSIZE, ssl=False)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+
+
+async def _open_airs_session(app):
+    app[AIRS_SESSION] = _airs_client_session()
+    app[PROFILE_SESSIONS] = {}
+    # AIRS_FAST_START: open the first scan connection before serving
+    await aprewarm(app[AIRS_SESSION], AIRS_API_URL)
+    ready()
+    yield
+    for session in app[PROFILE_SESSIONS].values():
+        await session.close()
+    await app[AIRS_SESSION].close()
+
+
+async def _open_llm_session(app):
+    # Separate pool so slow generations never hold scan connections
+    app[LLM_SESSION] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=LLM_POOL_MAXSIZE),
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=LLM_TIMEOUT, sock_read=LLM_TIMEOUT)
+    )
+    yield
+    await app[LLM_SESSION].close()
+
+
+def create_app(profile):
+    require_api_key()
+    set_security_profile(profile.security_profile)
+    register_stats(verdict_cache=cache_stats, speculative=speculative_stats, batching=batch_stats,
+                   logging=log_stats, circuit_breaker=breaker_stats, hedging=hedge_stats,
+                   startup=startup_stats, scan_queue=queue_stats)
+    if ALERT_ONLY_PROFILES:
+        start_workers()  # drain jobs left queued by an earlier run
+
+    app = web.Application(middlewares=[_first_request, trace_middleware(), aiohttp_middleware()])
+    app[APP_PROFILE] = profile
+    app.cleanup_ctx.append(_open_airs_session)
+    app.cleanup_ctx.append(_open_llm_session)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/profiles/{security_profile}/v1/chat/completions", chat_completions)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    return app
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Shared, pooled HTTP session for Runtime Security API calls.
+
+Every app used to call requests.post() directly, which opens a brand new
+TCP + TLS connection per scan (two per allowed chat request). This module
+keeps one keep-alive connection pool per process, shared by all Flask
+worker threads, with counters that show how often connections are reused
+and how long handshakes take.
+
+Only connection failures are retried here: the scan never reached AIRS, so
+a retry costs one connect. A 429, 5xx or read timeout is not retried under
+the scan's timeout; it goes straight to the circuit breaker (and shedding
+to admission control), so a slow AIRS shows up as failures there instead
+of one call taking several timeouts. Retries are counted in "retries".
+
+Configuration (environment variables):
+    AIRS_POOL_CONNECTIONS  - number of per-host pools to keep (default 4)
+    AIRS_POOL_MAXSIZE      - max keep-alive connections per host (default 32)
+    AIRS_POOL_BLOCK        - "true" to wait for a free connection instead of
+                             opening an overflow one (default false)
+    AIRS_RETRY_TOTAL       - retries on connection errors (default 2)
+    AIRS_RETRY_BACKOFF     - exponential backoff factor in seconds (default 0.2)
+
+requests and urllib3 are imported when the session is first built, not at
+import time, so with AIRS_FAST_START the prewarm thread loads them while
+the app is still importing (see startup.py).
+"""
+
+import os
+import threading
+import time
+
+POOL_CONNECTIONS = int(os.getenv("AIRS_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("AIRS_POOL_MAXSIZE", "32"))
+POOL_BLOCK = os.getenv("AIRS_POOL_BLOCK", "false").lower() == "true"
+RETRY_TOTAL = int(os.getenv("AIRS_RETRY_TOTAL", "2"))
+RETRY_BACKOFF = float(os.getenv("AIRS_RETRY_BACKOFF", "0.2"))
+
+
+class PoolStats:
+    """Thread-safe counters for requests, new connections and handshake time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self.handshake_ms_total = 0.0
+        self.handshake_ms_max = 0.0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_connect(self, elapsed_ms):
+        with self._lock:
+            self.connections_opened += 1
+            self.handshake_ms_total += elapsed_ms
+            self.handshake_ms_max = max(self.handshake_ms_max, elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            opened = self.connections_opened
+            reused = max(self.requests - opened, 0)
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "connections_opened": opened,
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "handshake_ms_avg": round(self.handshake_ms_total / opened, 2) if opened else 0.0,
+                "handshake_ms_max": round(self.handshake_ms_max, 2),
+                "pool_maxsize": POOL_MAXSIZE,
+                "pool_block": POOL_BLOCK,
+                "retry_total": RETRY_TOTAL,
+            }
+
+
+stats = PoolStats()
+
+
+def _pooled_adapter_class(stats):
+    """HTTPAdapter whose pools time every new connection they open into stats."""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            stats.record_connect((time.perf_counter() - start) * 1000)
+
+    class _TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            # Includes the TLS handshake for HTTPS connections
+            start = time.perf_counter()
+            super().connect()
+            stats.record_connect((time.perf_counter() - start) * 1000)
+
+    class _TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TimedHTTPConnection
+
+    class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+    class PooledAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _TimedHTTPConnectionPool,
+                "https": _TimedHTTPSConnectionPool,
+            }
+
+        def send(self, request, **kwargs):
+            stats.record_request()
+            return super().send(request, **kwargs)
+
+    return PooledAdapter
+
+
+def build_session(pool_stats=None):
+    """A new pooled session; scan clients for extra AIRS profiles get their own."""
+    import requests
+    import urllib3
+    from urllib3.util.retry import Retry
+
+    # Scans use verify=False (testing only!); don't warn on every call
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    pool_stats = pool_stats or stats
+
+    class CountingRetry(Retry):
+        def increment(self, *args, **kwargs):
+            retry = super().increment(*args, **kwargs)  # raises once retries run out
+            pool_stats.record_retry()
+            return retry
+
+    # Connection errors only; see the module docstring
+    retry = CountingRetry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = _pooled_adapter_class(pool_stats)(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=POOL_BLOCK,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def pool_stats():
+    """Return a JSON-serialisable snapshot of connection pool counters."""
+    return stats.snapshot()
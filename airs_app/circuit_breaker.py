@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker and adaptive timeout for Runtime Security scans.
+
+On an API error scan_with_runtime_security returned a fail-open verdict, but
+only after waiting out a fixed 30 s timeout, so during an AIRS brownout every
+request took 30 s. The breaker watches scan outcomes:
+
+    closed     - scans go to the API; AIRS_BREAKER_FAILURES consecutive
+                 failures open the breaker
+    open       - scans are answered at once with the fail-mode verdict
+                 for AIRS_BREAKER_COOLDOWN_S seconds
+    half_open  - one probe scan goes through; success closes the breaker,
+                 failure opens it for another cooldown
+
+The per-call timeout follows observed latency: the AIRS_TIMEOUT_PERCENTILE
+of recent successful scans times AIRS_TIMEOUT_MULTIPLIER, clamped between
+AIRS_TIMEOUT_MIN_MS and AIRS_TIMEOUT_MAX_MS (the old fixed 30 s). Until
+enough scans have been seen the maximum is used.
+
+AIRS_FAIL_MODE decides the verdict returned while the breaker is open or a
+scan fails: "open" allows the request (the old behaviour), "closed" blocks it.
+
+Configuration (environment variables):
+    AIRS_BREAKER              - "false" to disable the breaker (default true)
+    AIRS_BREAKER_FAILURES     - consecutive failures that open it (default 5)
+    AIRS_BREAKER_COOLDOWN_S   - seconds open before a probe (default 10)
+    AIRS_FAIL_MODE            - open or closed (default open)
+    AIRS_TIMEOUT_PERCENTILE   - latency percentile to scale (default 99)
+    AIRS_TIMEOUT_MULTIPLIER   - headroom over that percentile (default 3)
+    AIRS_TIMEOUT_MIN_MS       - lower bound (default 1000)
+    AIRS_TIMEOUT_MAX_MS       - upper bound and initial timeout (default 30000)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from .request_log import log_event
+
+BREAKER_ENABLED = os.getenv("AIRS_BREAKER", "true").lower() == "true"
+BREAKER_FAILURES = int(os.getenv("AIRS_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("AIRS_BREAKER_COOLDOWN_S", "10"))
+FAIL_MODE = os.getenv("AIRS_FAIL_MODE", "open").lower()
+TIMEOUT_PERCENTILE = float(os.getenv("AIRS_TIMEOUT_PERCENTILE", "99"))
+TIMEOUT_MULTIPLIER = float(os.getenv("AIRS_TIMEOUT_MULTIPLIER", "3"))
+TIMEOUT_MIN = float(os.getenv("AIRS_TIMEOUT_MIN_MS", "1000")) / 1000
+TIMEOUT_MAX = float(os.getenv("AIRS_TIMEOUT_MAX_MS", "30000")) / 1000
+
+# Successful scans needed before the timeout adapts
+MIN_SAMPLES = 20
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _percentile(ordered, pct):
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def fail_result(message):
+    """Verdict for a scan that could not be completed, per AIRS_FAIL_MODE."""
+    return {
+        "category": "error",
+        "action": "block" if FAIL_MODE == "closed" else "allow",
+        "error": message
+    }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with a latency-derived timeout."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN,
+                 samples=256):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._latencies = deque(maxlen=samples)
+        self._timeout = TIMEOUT_MAX
+        self.opened = 0
+        self.rejected = 0
+        self.successes = 0
+        self.errors = 0
+
+    def allow(self):
+        """True if a scan may go to the API now; False means use fallback()."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.cooldown:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and (self._probe_started is None
+                                            or now - self._probe_started > TIMEOUT_MAX):
+                # A probe that never reported back (e.g. shed) is replaced
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def fallback(self):
+        return fail_result("circuit breaker open: Runtime Security API unavailable")
+
+    def timeout(self):
+        """Seconds to wait for one scan call."""
+        return self._timeout
+
+    def record_success(self, elapsed=None):
+        with self._lock:
+            self.successes += 1
+            self._consecutive = 0
+            if elapsed is not None:
+                self._latencies.append(elapsed)
+                if len(self._latencies) >= MIN_SAMPLES:
+                    self._timeout = self._adapted_timeout()
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.errors += 1
+            self._consecutive += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED
+                                           and self._consecutive >= self.failures):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._set_state(OPEN)
+
+    def _adapted_timeout(self):
+        observed = _percentile(sorted(self._latencies), TIMEOUT_PERCENTILE)
+        return min(max(observed * TIMEOUT_MULTIPLIER, TIMEOUT_MIN), TIMEOUT_MAX)
+
+    def _set_state(self, state):
+        # Called with the lock held
+        self.state = state
+        self._probe_started = None
+        level = "warning" if state == OPEN else "info"
+        log_event(f"breaker.{state}", level, consecutive_failures=self._consecutive)
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "enabled": True,
+                "state": self.state,
+                "state_value": _STATE_VALUES[self.state],
+                "fail_mode": FAIL_MODE,
+                "consecutive_failures": self._consecutive,
+                "times_opened": self.opened,
+                "rejected": self.rejected,
+                "successes": self.successes,
+                "errors": self.errors,
+                "timeout_s": round(self._timeout, 3),
+                "latency_p50_ms": round(_percentile(ordered, 50) * 1000, 1) if ordered else 0.0,
+                "latency_p99_ms": round(_percentile(ordered, 99) * 1000, 1) if ordered else 0.0,
+            }
+
+
+class _NoBreaker:
+    """Stand-in when AIRS_BREAKER=false: fixed timeout, never opens."""
+
+    def allow(self):
+        return True
+
+    def fallback(self):
+        return fail_result("circuit breaker disabled")
+
+    def timeout(self):
+        return TIMEOUT_MAX
+
+    def record_success(self, elapsed=None):
+        pass
+
+    def record_failure(self):
+        pass
+
+    def stats(self):
+        return {"enabled": False, "fail_mode": FAIL_MODE, "timeout_s": TIMEOUT_MAX}
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker():
+    """Return the process-wide scan breaker, creating it on first use."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker() if BREAKER_ENABLED else _NoBreaker()
+    return _breaker
+
+
+def breaker_stats():
+    return get_breaker().stats()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Settings shared by every app profile, and the profiles themselves.
+
+A profile is one of the deployment variants that used to be a separate
+runtime_test_app_*.py file. AIRS_APP_PROFILE selects it (or the name passed
+to create_app()); everything else still comes from the same environment
+variables as before.
+
+Configuration (environment variables):
+    AIRS_APP_PROFILE      - standard, streaming, cloudrun or async (default streaming)
+    PORT                  - listen port (default: the profile's)
+    PANW_AI_SEC_API_KEY   - Runtime Security API key (required)
+    PRISMA_AIRS_PROFILE   - AIRS security profile (default: the app profile's)
+    AIRS_API_URL          - scan API base URL; point at mock_airs.py to test offline
+    OPENAI_API_KEY        - enables the upstream LLM (see llm_backend.py)
+    BLOCK_STATUS_CODE     - HTTP status for blocked requests (default 200)
+    MODEL_NAME            - model echoed in response bodies (default gpt-4o-mini)
+"""
+
+import os
+import sys
+
+API_KEY = os.getenv("PANW_AI_SEC_API_KEY")
+# Base URL of the scan API; point at mock_airs.py to test offline
+AIRS_API_URL = os.getenv("AIRS_API_URL", "https://service.api.aisecurity.paloaltonetworks.com").rstrip("/")
+RUNTIME_API_URL = f"{AIRS_API_URL}/v1/scan/sync/request"
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+USE_REAL_LLM = bool(OPENAI_API_KEY)
+BLOCK_STATUS_CODE = int(os.getenv("BLOCK_STATUS_CODE", "200"))
+# Model name echoed back in the OpenAI-shaped response body. gpt-3.5-turbo
+# retires 2026-10-23, so default to gpt-4o-mini and let callers override.
+MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
+APP_PROFILE = os.getenv("AIRS_APP_PROFILE", "streaming")
+
+
+class AppProfile:
+    """One deployment variant: which server, whether it streams, which port."""
+
+    def __init__(self, name, server, streaming, port, title, airs_profile="chatbot",
+                 environment=None, root_health=False, debug=True):
+        self.name = name
+        self.server = server            # "flask" or "aiohttp"
+        self.streaming = streaming      # load the stream encoders, pacing and guard
+        self.default_port = port
+        self.title = title
+        self.airs_profile = airs_profile
+        self.environment = environment  # reported in /health when set
+        self.root_health = root_health  # also answer health checks on /
+        self.debug = debug
+
+    @property
+    def port(self):
+        return int(os.getenv("PORT", self.default_port))
+
+    @property
+    def security_profile(self):
+        """The PRISMA_AIRS_PROFILE to scan with."""
+        return os.getenv("PRISMA_AIRS_PROFILE", self.airs_profile)
+
+
+PROFILES = {
+    "standard": AppProfile("standard", "flask", streaming=False, port=5000,
+                           title="AI Runtime Security Test Application (Direct API)",
+                           airs_profile="ai-sec-security"),
+    "streaming": AppProfile("streaming", "flask", streaming=True, port=5000,
+                            title="AI Runtime Security Test App (STREAMING ENABLED)"),
+    "cloudrun": AppProfile("cloudrun", "flask", streaming=True, port=8080,
+                           title="AI Runtime Security Streaming App (Cloud Run)",
+                           environment="Google Cloud Run", root_health=True, debug=False),
+    "async": AppProfile("async", "aiohttp", streaming=True, port=5000,
+                        title="AI Runtime Security Test App (ASYNC, STREAMING ENABLED)"),
+}
+
+# Entry points that used to be separate files
+LEGACY_MODULES = {
+    "runtime_test_app": "standard",
+    "runtime_test_app_direct_api": "standard",
+    "runtime_test_app_streaming": "streaming",
+    "runtime_test_app_streaming_cloudrun": "cloudrun",
+    "runtime_test_app_async": "async",
+}
+
+
+def get_profile(name=None):
+    """Resolve a profile name (or legacy module name) to an AppProfile."""
+    if isinstance(name, AppProfile):
+        return name
+    name = name or APP_PROFILE
+    name = LEGACY_MODULES.get(name[:-3] if name.endswith(".py") else name, name)
+    if name not in PROFILES:
+        raise ValueError(f"unknown app profile {name!r}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def require_api_key():
+    if not API_KEY:
+        print("❌ ERROR: PANW_AI_SEC_API_KEY not set")
+        print("   Run: export PANW_AI_SEC_API_KEY='your-key'")
+        sys.exit(1)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Flask server for the standard, streaming and cloudrun profiles.
+
+The stream encoders, pacing and stream guard are only imported for profiles
+that stream, so the standard profile starts with the scan path alone.
+"""
+
+from flask import Flask, Response, jsonify, request
+
+from .admission import Overloaded, admission_stats
+from .airs_session import pool_stats
+from .circuit_breaker import breaker_stats
+from .hedging import hedge_requested, hedge_stats
+from .config import (
+    BLOCK_STATUS_CODE, MODEL_NAME, RUNTIME_API_URL, USE_REAL_LLM, require_api_key
+)
+from .llm import get_llm_response, get_llm_stream
+from .llm_backend import llm_stats
+from .metrics import CONTENT_TYPE, instrument_flask, register_stats, render_metrics, time_stage
+from .request_log import log_event, log_stats, log_verdict, trace_flask
+from .responses import BLOCKED_PROMPT, BLOCKED_RESPONSE, completion_body, latest_user_prompt
+from .scan_batcher import batch_stats
+from .scan_cache import cache_allowed, cache_stats
+from .scan_queue import ALERT_ONLY_PROFILES, queue_stats, start_workers
+from .scanner import (
+    UnknownProfile, detected_threats, get_scan_client, profile_requested, profile_stats, scan_conversation,
+    scan_with_runtime_security, set_security_profile
+)
+from .speculative import SAVED_MS_HEADER, Speculation, speculation_requested, speculative_stats
+from .startup import first_request, startup_stats
+
+
+def create_app(profile):
+    require_api_key()
+    set_security_profile(profile.security_profile)
+
+    if profile.streaming:
+        from flask import stream_with_context
+
+        from .pacing import pacer_for_request
+        from .stream_formats import as_chunks, available_formats, get_stream_format, stream_frames
+        from .stream_guard import STREAM_GUARD_ENABLED, StreamGuard
+
+    app = Flask(__name__)
+    app.config["AIRS_PROFILE"] = profile
+    instrument_flask(app)
+    trace_flask(app)
+    register_stats(connection_pool=pool_stats, verdict_cache=cache_stats,
+                   speculative=speculative_stats, batching=batch_stats, logging=log_stats,
+                   circuit_breaker=breaker_stats, hedging=hedge_stats, startup=startup_stats,
+                   scan_queue=queue_stats)
+    app.before_request(first_request)
+    if ALERT_ONLY_PROFILES:
+        start_workers()  # drain jobs left queued by an earlier run
+
+    def stream_response(format_cls, content, pacer, status=200, headers=None):
+        return Response(
+            stream_with_context(stream_frames(format_cls(MODEL_NAME), content, pacer)),
+            mimetype=format_cls.mimetype,
+            status=status,
+            headers=headers
+        )
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    @app.route("/profiles/<security_profile>/v1/chat/completions", methods=["POST"])
+    def chat_completions(security_profile=None):
+        """
+        OpenAI-compatible endpoint with Runtime Security scanning.
+        Streaming profiles support both streaming and non-streaming modes.
+        The AIRS security profile comes from the path, X-AIRS-Profile or the app profile.
+        """
+        try:
+            airs_profile = profile_requested(request.headers, security_profile)
+            with time_stage("json_parse"):
+                data = request.json
+            use_cache = cache_allowed(request.headers)
+            speculate = speculation_requested(request.headers)
+            hedge_requested(request.headers)  # X-AIRS-Hedge, for this request's scans
+            stream = bool(data.get("stream", False)) and profile.streaming
+            stream_format = format_cls = pacer = None
+            if stream:
+                stream_format = request.args.get("format", "openai")  # see stream_formats.py
+                format_cls = get_stream_format(stream_format)
+                try:
+                    pacer = pacer_for_request(request.args)  # none, fixed:<ms>, tps:<n>, replay
+                except (ValueError, OSError) as e:
+                    return jsonify({"error": f"Invalid pace: {e}"}), 400
+
+            messages = data.get("messages", [])
+            # The LLM gets the whole conversation; the response scan pairs
+            # its answer with the turn it answers
+            prompt = latest_user_prompt(messages)
+            if not prompt:
+                return jsonify({"error": "No user message found"}), 400
+
+            log_event("request.received", prompt=prompt[:100], stream=stream, format=stream_format,
+                      security_profile=airs_profile or profile.security_profile)
+
+            # Start the LLM call now so it overlaps the prompt scan (opt-in)
+            speculation = (Speculation(get_llm_response, messages, profile.streaming)
+                           if speculate else None)
+
+            # Scan the conversation with Runtime Security (only turns not seen before)
+            try:
+                scan_result = scan_conversation(messages, use_cache=use_cache, profile=airs_profile)
+            except BaseException:
+                # Shed or failed scan: the speculative generation is never used
+                if speculation:
+                    speculation.discard()
+                raise
+            category = scan_result.get("category", "unknown")
+            action = scan_result.get("action", "unknown")
+            log_verdict("prompt", scan_result, detected=detected_threats(scan_result, "prompt_detected"))
+
+            # Block malicious prompts
+            if category == "malicious" or action == "block":
+                log_event("request.blocked", "warning", stage="prompt")
+                if speculation:
+                    speculation.discard()
+                if stream:
+                    return stream_response(format_cls, BLOCKED_PROMPT, pacer, status=BLOCK_STATUS_CODE)
+                with time_stage("serialize"):
+                    return jsonify(completion_body(prompt, BLOCKED_PROMPT, 15)), BLOCK_STATUS_CODE
+
+            # Allow safe prompts - get LLM response
+            log_event("request.allowed", "debug")
+            # An alert-only profile can never cut the stream; one queued response scan is enough
+            guarded = stream and STREAM_GUARD_ENABLED and not get_scan_client(airs_profile).alert_only
+            if speculation:
+                llm_response = speculation.result()
+                log_event("speculation.used", "debug", saved_ms=round(speculation.saved_ms, 1))
+            elif guarded:
+                # Upstream tokens go through the guard into the encoder unbuffered
+                llm_response = get_llm_stream(messages)
+            else:
+                llm_response = get_llm_response(messages, profile.streaming)
+            extra_headers = {SAVED_MS_HEADER: f"{speculation.saved_ms:.1f}"} if speculation else {}
+
+            if guarded:
+                # Scan the response in growing windows while it streams instead
+                # of holding the first chunk back for a full scan
+                llm_response = StreamGuard(
+                    as_chunks(llm_response),
+                    lambda text: scan_with_runtime_security(prompt, text, use_cache=use_cache,
+                                                            profile=airs_profile,
+                                                            prompt_verdict=scan_result)
+                )
+            else:
+                # Scan the response too (optional but recommended)
+                response_scan = scan_with_runtime_security(prompt, llm_response, use_cache=use_cache,
+                                                           profile=airs_profile, prompt_verdict=scan_result)
+                response_detected = detected_threats(response_scan, "response_detected")
+                log_verdict("response", response_scan, detected=response_detected)
+                failed_closed = response_scan.get("category") == "error"  # AIRS_FAIL_MODE=closed
+                if (response_detected or failed_closed) and response_scan.get("action") == "block":
+                    log_event("request.blocked", "warning", stage="response")
+                    llm_response = BLOCKED_RESPONSE
+
+            if stream:
+                log_event("stream.start", "debug", format=stream_format)
+                return stream_response(format_cls, llm_response, pacer, headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no',
+                    **extra_headers
+                })
+
+            # Return OpenAI-compatible response
+            with time_stage("serialize"):
+                return jsonify(completion_body(prompt, llm_response)), 200, extra_headers
+
+        except UnknownProfile as e:
+            log_event("request.rejected", "warning", security_profile=e.name)
+            return jsonify({"error": str(e)}), e.status
+        except Overloaded as e:
+            log_event("request.shed", "warning", upstream=e.upstream, reason=e.reason)
+            return jsonify({"error": str(e)}), e.status, {"Retry-After": e.retry_after_header}
+        except Exception as e:
+            import traceback
+            log_event("request.error", "error", error=str(e), traceback=traceback.format_exc())
+            return jsonify({"error": str(e)}), 500
+
+    def health():
+        """Health check endpoint."""
+        body = {
+            "status": "healthy",
+            "runtime_security": "enabled (direct API)",
+            "app_profile": profile.name,
+            "profile": profile.security_profile,
+            "llm": "mock" if not USE_REAL_LLM else "openai",
+            "llm_upstream": llm_stats(),
+            "api_url": RUNTIME_API_URL,
+        }
+        if profile.streaming:
+            body["streaming"] = f"supported ({', '.join(available_formats())})"
+        if profile.environment:
+            body["environment"] = profile.environment
+        body.update({
+            "connection_pool": pool_stats(),
+            "verdict_cache": cache_stats(),
+            "profiles": profile_stats(),
+            "scan_queue": queue_stats(),
+            "speculative": speculative_stats(),
+            "batching": batch_stats(),
+            "logging": log_stats(),
+            "admission": admission_stats(),
+            "circuit_breaker": breaker_stats(),
+            "hedging": hedge_stats(),
+            "startup": startup_stats()
+        })
+        return jsonify(body)
+
+    app.add_url_rule("/health", "health", health, methods=["GET"])
+    if profile.root_health:
+        app.add_url_rule("/", "root", health, methods=["GET"])
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus metrics."""
+        return render_metrics(), 200, {"Content-Type": CONTENT_TYPE}
+
+    return app
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Hedged Runtime Security scan calls.
+
+A few scans take seconds where most take tens of milliseconds, and that
+tail is the tail of chat_completions. With hedging on, a scan that has not
+answered by the observed p95 gets a duplicate request with the same
+payload and tr_id. Whichever succeeds first is used. The other is
+cancelled. In threads a running requests call cannot be cancelled, so its
+answer is discarded instead.
+
+Extra load is capped. Each scan adds AIRS_HEDGE_MAX_RATIO of a hedge
+token, and a hedge spends a whole token. So at most that fraction of scans
+are duplicated, however slow AIRS gets, and the slot and rate token the
+scan already holds cover the duplicate too. The time a winning hedge saved
+is measured when the abandoned call finishes, so only the threaded apps
+report it; the aiohttp app really cancels the loser. Hedging waits for
+AIRS_HEDGE_MIN_SAMPLES successful calls before it knows the p95, and the
+p95 is recomputed every few dozen calls rather than on every scan. Each
+sample is the time from sending the original request to the first
+successful answer, whichever call gave it, so hedging does not drag its own
+delay down. It only applies to direct scan calls, not to micro-batched ones
+(AIRS_BATCH).
+
+In the threaded apps the original calls and the duplicates run on two
+separate pools of AIRS_HEDGE_WORKERS threads, so scans that never hedge
+cannot queue behind hedges. When every original-call thread is busy, the
+scan runs unhedged on the caller's thread instead of waiting for one.
+
+Configuration (environment variables):
+    AIRS_HEDGE               - "true" to hedge every scan (default false)
+    AIRS_HEDGE_PERCENTILE    - latency percentile after which to hedge (default 95)
+    AIRS_HEDGE_MAX_RATIO     - most hedges per scan, e.g. 0.05 = 5% (default 0.05)
+    AIRS_HEDGE_MIN_DELAY_MS  - never hedge sooner than this (default 20)
+    AIRS_HEDGE_MIN_SAMPLES   - successful calls seen before hedging (default 50)
+    AIRS_HEDGE_WORKERS       - threads for original and for duplicate calls, each, in the
+                               threaded apps (default 64)
+
+Clients can opt in or out per request with "X-AIRS-Hedge: on|off".
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .metrics import METRICS_ENABLED, Counter, Histogram
+
+HEDGE_ENABLED = os.getenv("AIRS_HEDGE", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("AIRS_HEDGE_PERCENTILE", "95"))
+HEDGE_MAX_RATIO = float(os.getenv("AIRS_HEDGE_MAX_RATIO", "0.05"))
+HEDGE_MIN_DELAY = float(os.getenv("AIRS_HEDGE_MIN_DELAY_MS", "20")) / 1000
+HEDGE_MIN_SAMPLES = int(os.getenv("AIRS_HEDGE_MIN_SAMPLES", "50"))
+HEDGE_WORKERS = int(os.getenv("AIRS_HEDGE_WORKERS", "64"))
+
+HEDGE_HEADER = "X-AIRS-Hedge"
+
+# Unspent hedge tokens kept for a burst of slow scans
+_BUDGET_MAX = 10.0
+# Calls between recomputing the hedge delay from the latency window
+_RECOMPUTE_EVERY = 32
+
+HEDGES = Counter("airs_scan_hedges_total",
+                 "Scans past the hedge delay: won/lost by the hedge, or skipped for budget.",
+                 ("outcome",))
+HEDGE_SAVED = Histogram("airs_scan_hedge_saved_seconds",
+                        "How much sooner a winning hedge answered than its original call.")
+
+_hedge = contextvars.ContextVar("airs_hedge", default=None)
+
+
+def hedge_requested(headers):
+    """Apply the X-AIRS-Hedge override of AIRS_HEDGE to the current request."""
+    value = headers.get(HEDGE_HEADER, "").lower()
+    if value in ("on", "true", "1"):
+        enabled = True
+    elif value in ("off", "false", "0"):
+        enabled = False
+    else:
+        enabled = HEDGE_ENABLED
+    _hedge.set(enabled)
+    return enabled
+
+
+def _percentile(ordered, pct):
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class Hedger:
+    """Latency window, hedge budget and counters shared by every scan client."""
+
+    def __init__(self, samples=512):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=samples)
+        self._observed = 0
+        self._delay = None
+        self._budget = 1.0
+        self._executors = {}
+        # Original calls in flight on the primary pool; never more than it has threads
+        self._primary_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+        self.calls = 0
+        self.hedged = 0
+        self.won = 0
+        self.lost = 0
+        self.skipped = 0
+        self.saved_ms_total = 0.0
+
+    def enabled(self):
+        enabled = _hedge.get()
+        return HEDGE_ENABLED if enabled is None else enabled
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while too few calls are known."""
+        return self._delay
+
+    def _observe(self, elapsed):
+        with self._lock:
+            self._latencies.append(elapsed)
+            self._observed += 1
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return
+            if self._delay is None or self._observed % _RECOMPUTE_EVERY == 0:
+                self._delay = max(_percentile(sorted(self._latencies), HEDGE_PERCENTILE), HEDGE_MIN_DELAY)
+
+    def _start(self):
+        with self._lock:
+            self.calls += 1
+            self._budget = min(self._budget + HEDGE_MAX_RATIO, _BUDGET_MAX)
+
+    def _take_budget(self):
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                self.hedged += 1
+                return True
+            self.skipped += 1
+        if METRICS_ENABLED:
+            HEDGES.inc(outcome="skipped")
+        return False
+
+    def _record(self, hedge_won):
+        with self._lock:
+            if hedge_won:
+                self.won += 1
+            else:
+                self.lost += 1
+        if METRICS_ENABLED:
+            HEDGES.inc(outcome="won" if hedge_won else "lost")
+
+    def _record_saved(self, saved):
+        with self._lock:
+            self.saved_ms_total += saved * 1000
+        if METRICS_ENABLED:
+            HEDGE_SAVED.observe(saved)
+
+    def _timed(self, fn):
+        start = time.perf_counter()
+        result = fn()
+        self._observe(time.perf_counter() - start)
+        return result
+
+    def _pool(self, name):
+        """The "primary" or "hedge" thread pool, created on first use."""
+        executor = self._executors.get(name)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(name)
+                if executor is None:
+                    executor = self._executors[name] = ThreadPoolExecutor(
+                        max_workers=HEDGE_WORKERS, thread_name_prefix=f"airs-{name}")
+        return executor
+
+    def call(self, fn):
+        """Run fn(), hedged with a second fn() once it outlasts the hedge delay."""
+        if not self.enabled():
+            return fn()
+        self._start()
+        delay = self.delay()
+        # The caller must stay free to take a hedge's answer, so the original
+        # call needs a pool thread; with none free it runs here, unhedged
+        if delay is None or not self._primary_slots.acquire(blocking=False):
+            return self._timed(fn)
+
+        start = time.perf_counter()
+        primary = self._pool("primary").submit(contextvars.copy_context().run, fn)
+        primary.add_done_callback(lambda f: self._primary_slots.release())
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            result = primary.result()
+            self._observe(time.perf_counter() - start)
+            return result
+
+        hedge = self._pool("hedge").submit(contextvars.copy_context().run, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                answered = time.perf_counter()
+                # Timed from the original send: what the scan actually took
+                self._observe(answered - start)
+                self._record(future is hedge)
+                for loser in pending:
+                    # A running requests call cannot be stopped; its answer is dropped
+                    loser.cancel()
+                    if future is hedge:
+                        loser.add_done_callback(lambda f: self._loser_done(f, answered))
+                return future.result()
+        raise error
+
+    def _loser_done(self, future, answered):
+        if not future.cancelled() and future.exception() is None:
+            self._record_saved(time.perf_counter() - answered)
+
+    async def acall(self, fn):
+        """Await fn(), hedged with a second fn() once it outlasts the hedge delay."""
+        if not self.enabled():
+            return await fn()
+        self._start()
+        delay = self.delay()
+        if delay is None:
+            start = time.perf_counter()
+            result = await fn()
+            self._observe(time.perf_counter() - start)
+            return result
+
+        import asyncio
+
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(fn())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._take_budget():
+                result = await primary
+                self._observe(time.perf_counter() - start)
+                return result
+
+            hedge = asyncio.ensure_future(fn())
+            tasks.add(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    # Timed from the original send: what the scan actually took
+                    self._observe(time.perf_counter() - start)
+                    self._record(task is hedge)
+                    return task.result()
+            raise error
+        finally:
+            # The loser, or both if the request itself was cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        delay = self.delay()
+        with self._lock:
+            return {
+                "enabled_by_default": HEDGE_ENABLED,
+                "percentile": HEDGE_PERCENTILE,
+                "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "samples": len(self._latencies),
+                "max_ratio": HEDGE_MAX_RATIO,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "won": self.won,
+                "lost": self.lost,
+                "skipped_budget": self.skipped,
+                "saved_ms_total": round(self.saved_ms_total, 1),
+            }
+
+
+hedger = Hedger()
+
+
+def hedge_stats():
+    return hedger.stats()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+LLM calls for the apps: the upstream client when OPENAI_API_KEY is set,
+otherwise a mock reply.
+"""
+
+from .config import USE_REAL_LLM
+from .llm_backend import get_llm_client
+from .metrics import observe_stage
+from .responses import latest_user_prompt
+
+MOCK_REPLY = "This is a safe response to: {}..."
+MOCK_STREAMING_REPLY = "This is a safe streaming response to your prompt: {}..."
+
+
+def _mock(messages, streaming):
+    # Mock response for testing
+    prompt = latest_user_prompt(messages) or ""
+    return (MOCK_STREAMING_REPLY if streaming else MOCK_REPLY).format(prompt[:50])
+
+
+@observe_stage("llm")
+def get_llm_response(messages: list, streaming: bool = False) -> str:
+    """Get response from LLM (or mock for testing) to the chat messages."""
+    if USE_REAL_LLM:
+        return get_llm_client().complete(messages)
+    return _mock(messages, streaming)
+
+
+def get_llm_stream(messages: list):
+    """Stream LLM tokens as they arrive (or the mock response in word chunks)."""
+    from .stream_formats import iter_chunks
+
+    if USE_REAL_LLM:
+        return get_llm_client().stream(messages)
+    return iter_chunks(get_llm_response(messages, streaming=True))
+
+
+@observe_stage("llm")
+async def aget_llm_response(session, messages: list) -> str:
+    """Get response from LLM (or mock for testing) without blocking."""
+    if USE_REAL_LLM:
+        return await get_llm_client().acomplete(session, messages)
+    return _mock(messages, streaming=True)
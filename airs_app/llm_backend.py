@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Upstream LLM client for the test applications.
+
+When OPENAI_API_KEY is set the apps send allowed prompts to an
+OpenAI-compatible chat completions API instead of returning a mock string.
+The request's whole message list is forwarded, so multi-turn conversations
+keep their system prompt and history.
+Any compatible server works (OpenAI, vLLM, Ollama, LiteLLM, or mock_llm.py
+for offline tests); point LLM_API_URL at its /v1 base.
+
+Calls go over one pooled keep-alive session per process and through the
+"llm" admission limiter (see admission.py); a stream holds its slot until
+the upstream finishes. Streaming calls
+return a TokenStream: an iterator over the upstream content deltas as they
+arrive, which stream_frames() feeds straight into the chosen format encoder
+(or through a StreamGuard first), so the response is only buffered when a
+full response scan needs the whole text.
+
+Other upstream APIs plug in by subclassing LLMClient and registering the
+class in BACKENDS under the name used for LLM_BACKEND.
+
+Configuration (environment variables):
+    OPENAI_API_KEY     - API key; enables the upstream LLM
+    LLM_BACKEND        - client to use (default "openai")
+    LLM_API_URL        - API base URL (default https://api.openai.com/v1)
+    LLM_MODEL          - upstream model (default MODEL_NAME or gpt-4o-mini)
+    LLM_MAX_TOKENS     - max completion tokens (default 512)
+    LLM_TIMEOUT        - seconds to connect / between streamed reads (default 60)
+    LLM_POOL_MAXSIZE   - max keep-alive connections to the upstream (default 32)
+"""
+
+import json
+import os
+import threading
+import time
+import weakref
+
+from .admission import get_limiter
+from .metrics import METRICS_ENABLED, STAGE_SECONDS
+from .request_log import log_event
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_API_URL = os.getenv("LLM_API_URL", "https://api.openai.com/v1").rstrip("/")
+LLM_MODEL = os.getenv("LLM_MODEL") or os.getenv("MODEL_NAME", "gpt-4o-mini")
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "512"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "32"))
+
+
+class TokenStream:
+    """Iterator over upstream content deltas.
+
+    Deltas already carry their own whitespace, hence separator "" (word
+    chunks from iter_chunks are joined with " "). finish_reason holds the
+    upstream's value once the stream is exhausted.
+    """
+
+    separator = ""
+
+    def __init__(self, deltas):
+        self._deltas = deltas
+        self.finish_reason = "stop"
+
+    def __iter__(self):
+        for delta, finish_reason in self._deltas:
+            if finish_reason:
+                self.finish_reason = finish_reason
+            if delta:
+                yield delta
+
+
+class LLMClient:
+    """Base upstream client: complete() returns text, stream() a TokenStream.
+
+    Each call takes the request's chat messages (a list of role/content dicts).
+    """
+
+    def __init__(self, api_url, api_key, model):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def complete(self, messages):
+        raise NotImplementedError
+
+    def stream(self, messages):
+        raise NotImplementedError
+
+    async def acomplete(self, session, messages):
+        raise NotImplementedError
+
+    def _count(self, error=False):
+        with self._lock:
+            if error:
+                self.errors += 1
+            else:
+                self.requests += 1
+
+    def stats(self):
+        with self._lock:
+            return {"backend": type(self).__name__, "api_url": self.api_url, "model": self.model,
+                    "requests": self.requests, "errors": self.errors}
+
+
+class OpenAIClient(LLMClient):
+    """OpenAI-compatible /chat/completions client."""
+
+    def __init__(self, api_url, api_key, model):
+        super().__init__(api_url, api_key, model)
+        self.url = f"{api_url}/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        # Imported here so apps without an upstream LLM never load requests for it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._http_error = requests.exceptions.RequestException
+        # No retries: a replayed completion costs tokens and a stream cannot resume
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=LLM_POOL_MAXSIZE, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _body(self, messages, stream):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": LLM_MAX_TOKENS,
+            "stream": stream,
+        }
+
+    def complete(self, messages):
+        with get_limiter("llm").slot():
+            self._count()
+            try:
+                resp = self.session.post(self.url, headers=self.headers,
+                                         json=self._body(messages, False), timeout=LLM_TIMEOUT)
+                resp.raise_for_status()
+                return resp.json()["choices"][0]["message"]["content"] or ""
+            except (self._http_error, KeyError, IndexError, ValueError):
+                self._count(error=True)
+                raise
+
+    def stream(self, messages):
+        slot = get_limiter("llm").acquire()
+        self._count()
+        # Send the request now so connection errors surface before any frame goes out
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(self.url, headers=self.headers, json=self._body(messages, True),
+                                     stream=True, timeout=LLM_TIMEOUT)
+            resp.raise_for_status()
+        except self._http_error:
+            slot.release()
+            self._count(error=True)
+            raise
+        tokens = TokenStream(self._read_events(resp, start, slot))
+        # A client that disconnects before the first token never runs the
+        # generator's cleanup; free the slot when the stream is collected
+        weakref.finalize(tokens, slot.release)
+        return tokens
+
+    def _read_events(self, resp, start, slot):
+        first = True
+        try:
+            with resp:
+                for line in resp.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[6:]
+                    if data == b"[DONE]":
+                        continue  # read to the end so the connection goes back to the pool
+                    choice = json.loads(data)["choices"][0]
+                    if first and METRICS_ENABLED:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+                    first = False
+                    yield choice.get("delta", {}).get("content"), choice.get("finish_reason")
+        except (self._http_error, KeyError, IndexError, ValueError) as e:
+            # Headers and earlier frames are already sent; end the stream cleanly
+            self._count(error=True)
+            log_event("llm.error", "error", error=str(e))
+            yield None, "error"
+        finally:
+            slot.release()
+            if METRICS_ENABLED:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm")
+
+    async def acomplete(self, session, messages):
+        """Non-streaming completion over the caller's aiohttp session."""
+        import aiohttp
+
+        async with get_limiter("llm", asynchronous=True).slot():
+            self._count()
+            try:
+                async with session.post(self.url, headers=self.headers,
+                                        json=self._body(messages, False)) as resp:
+                    resp.raise_for_status()
+                    return (await resp.json())["choices"][0]["message"]["content"] or ""
+            except (aiohttp.ClientError, KeyError, IndexError, ValueError):
+                self._count(error=True)
+                raise
+
+
+BACKENDS = {"openai": OpenAIClient}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide upstream client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if LLM_BACKEND not in BACKENDS:
+                    raise ValueError(f"unknown LLM_BACKEND: {LLM_BACKEND}")
+                _client = BACKENDS[LLM_BACKEND](LLM_API_URL, os.getenv("OPENAI_API_KEY", ""), LLM_MODEL)
+    return _client
+
+
+def llm_stats():
+    if not os.getenv("OPENAI_API_KEY"):
+        return {"backend": "mock"}
+    return get_llm_client().stats()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the test applications.
+
+The apps only had print statements, so there was no way to see where time
+went under load: waiting on the prompt scan, the LLM, the response scan or
+the stream itself. This module keeps a few in-process metrics and renders
+them in the Prometheus text format for a /metrics endpoint:
+
+    airs_stage_seconds{stage}                  - histogram per pipeline stage (json_parse,
+                                                 prompt_scan, llm, llm_first_token,
+                                                 response_scan, serialize, stream)
+    airs_scan_verdicts_total{stage,category,action}
+    airs_scan_threats_total{stage,threat}      - detected threat types per scan stage
+    airs_profile_scans_total{profile,category,action} - per AIRS security profile
+    airs_profile_scan_seconds{profile}         - histogram, scan time incl. cache hits
+    airs_response_scans_total{mode}            - response_only or combined
+    airs_conversation_messages_total{outcome}  - scanned or reused (cached prefix)
+    airs_response_scan_prompt_bytes_skipped_total - prompt bytes not re-sent with responses
+    airs_http_requests_total{path,method,status}
+    airs_http_request_seconds{path}            - histogram, handler time
+    airs_requests_in_flight / airs_scans_in_flight / airs_streams_in_flight
+    airs_stream_frames_total{format}
+    airs_admission_*{upstream}                 - queue depth, in flight, shed (admission.py)
+    airs_<section>_<stat>                      - numeric /health stats (pool, cache, ...)
+
+No client library is needed. Each gunicorn worker keeps its own metrics,
+so scrape each worker or run one worker per container. Set
+AIRS_METRICS=false to turn instrumentation off.
+"""
+
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("AIRS_METRICS", "true").lower() == "true"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY = []
+_STATS_SOURCES = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in progress."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, total_sum = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            le = 'le="%g"' % bound
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {total}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total_sum:.6f}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {total}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("airs_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+SCAN_VERDICTS = Counter("airs_scan_verdicts_total", "Scan verdicts by stage, category and action.",
+                        ("stage", "category", "action"))
+SCAN_THREATS = Counter("airs_scan_threats_total", "Detected threats by scan stage and threat type.",
+                       ("stage", "threat"))
+PROFILE_SCANS = Counter("airs_profile_scans_total", "Scan verdicts by security profile.",
+                        ("profile", "category", "action"))
+PROFILE_SECONDS = Histogram("airs_profile_scan_seconds", "Scan time per security profile.",
+                            ("profile",))
+RESPONSE_SCANS = Counter("airs_response_scans_total", "Response scans by payload mode.", ("mode",))
+PROMPT_BYTES_SKIPPED = Counter("airs_response_scan_prompt_bytes_skipped_total",
+                               "Prompt bytes not re-sent with response scans.")
+CONVERSATION_MESSAGES = Counter("airs_conversation_messages_total",
+                                "Conversation messages scanned or covered by a cached prefix verdict.",
+                                ("outcome",))
+HTTP_REQUESTS = Counter("airs_http_requests_total", "HTTP requests by route, method and status.",
+                        ("path", "method", "status"))
+HTTP_SECONDS = Histogram("airs_http_request_seconds", "Handler time per route.",
+                         ("path",))
+REQUESTS_IN_FLIGHT = Gauge("airs_requests_in_flight", "HTTP requests being handled.")
+SCANS_IN_FLIGHT = Gauge("airs_scans_in_flight", "Runtime Security scans awaiting a verdict.")
+STREAMS_IN_FLIGHT = Gauge("airs_streams_in_flight", "Streamed responses still being sent.")
+STREAM_FRAMES = Counter("airs_stream_frames_total", "Stream frames sent by format.", ("format",))
+
+
+def register_stats(**sources):
+    """Expose numeric values of stats functions (e.g. cache_stats) as gauges."""
+    _STATS_SOURCES.update(sources)
+
+
+def _stats_lines():
+    lines = []
+    for section, source in sorted(_STATS_SOURCES.items()):
+        try:
+            stats = source()
+        except Exception:
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = re.sub(r"[^a-zA-Z0-9_]", "_", f"airs_{section}_{key}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return lines
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_stats_lines())
+    return "\n".join(lines) + "\n"
+
+
+def _scan_stage(signature, args, kwargs):
+    bound = signature.bind_partial(*args, **kwargs)
+    return "response_scan" if bound.arguments.get("response") else "prompt_scan"
+
+
+def detected_threats(scan_result, field):
+    """Names of the threats flagged in prompt_detected or response_detected."""
+    return [k for k, v in scan_result.get(field, {}).items() if v]
+
+
+def _record_verdict(stage, result):
+    stage = stage.replace("_scan", "")
+    SCAN_VERDICTS.inc(stage=stage,
+                      category=result.get("category", "unknown"),
+                      action=result.get("action", "unknown"))
+    # A response verdict also carries the prompt's threats; count each stage's own
+    for threat in detected_threats(result, f"{stage}_detected"):
+        SCAN_THREATS.inc(stage=stage, threat=threat)
+
+
+def observe_scan(fn):
+    """Decorate a scan_with_runtime_security(..., prompt, response=None, ...) function.
+
+    Times it as prompt_scan or response_scan, tracks scans in flight and
+    counts the verdict and its threats. Works for plain and async functions.
+    """
+    if not METRICS_ENABLED:
+        return fn
+    signature = inspect.signature(fn)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            stage = _scan_stage(signature, args, kwargs)
+            with SCANS_IN_FLIGHT.track(), STAGE_SECONDS.time(stage=stage):
+                result = await fn(*args, **kwargs)
+            _record_verdict(stage, result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stage = _scan_stage(signature, args, kwargs)
+        with SCANS_IN_FLIGHT.track(), STAGE_SECONDS.time(stage=stage):
+            result = fn(*args, **kwargs)
+        _record_verdict(stage, result)
+        return result
+    return wrapper
+
+
+@contextmanager
+def time_stage(stage):
+    """Time the enclosed block as one pipeline stage (e.g. json_parse, serialize)."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    with STAGE_SECONDS.time(stage=stage):
+        yield
+
+
+def observe_stage(stage):
+    """Decorator timing a plain or async function as one pipeline stage."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with STAGE_SECONDS.time(stage=stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _StreamTally:
+    frames = 0
+
+
+@contextmanager
+def observe_stream(format_name):
+    """Track one stream: in flight, stream stage duration and frames sent.
+
+    Yields a tally; the caller adds to its .frames as frames go out.
+    """
+    tally = _StreamTally()
+    if not METRICS_ENABLED:
+        yield tally
+        return
+    with STREAMS_IN_FLIGHT.track(), STAGE_SECONDS.time(stage="stream"):
+        try:
+            yield tally
+        finally:
+            STREAM_FRAMES.inc(tally.frames, format=format_name)
+
+
+def instrument_flask(app):
+    """Count requests, handler time and requests in flight for a Flask app."""
+    if not METRICS_ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _metrics_record(response):
+        path = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(path=path, method=request.method, status=response.status_code)
+        HTTP_SECONDS.observe(time.perf_counter() - g.metrics_start, path=path)
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        # stream_with_context tears the request down a second time at the
+        # end of the stream; only the first teardown counts
+        if g.pop("metrics_start", None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+
+
+def aiohttp_middleware():
+    """aiohttp middleware with the same request metrics as instrument_flask."""
+    from aiohttp import web
+
+    @web.middleware
+    async def metrics_middleware(request, handler):
+        if not METRICS_ENABLED:
+            return await handler(request)
+        resource = request.match_info.route.resource
+        path = resource.canonical if resource is not None else "unmatched"
+        start = time.perf_counter()
+        status = 500
+        with REQUESTS_IN_FLIGHT.track():
+            try:
+                response = await handler(request)
+                status = response.status
+                return response
+            except web.HTTPException as e:
+                status = e.status
+                raise
+            finally:
+                HTTP_REQUESTS.inc(path=path, method=request.method, status=status)
+                HTTP_SECONDS.observe(time.perf_counter() - start, path=path)
+    return metrics_middleware
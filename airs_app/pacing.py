@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Pacing engine for streamed responses.
+
+The stream generators used to sleep a fixed 50 ms after every chunk, which
+held a worker thread for the whole stream. Pacing is now chosen per request
+and defaults to no delay at all:
+
+    none          - send chunks as fast as they are produced (default)
+    fixed:<ms>    - wait <ms> milliseconds between chunks
+    tps:<n>       - emit about <n> words (tokens) per second
+    replay        - replay inter-chunk delays recorded in AIRS_PACING_REPLAY_FILE
+                    (a JSON list of milliseconds; the last delay repeats)
+
+Delays follow a schedule anchored at the first chunk, so time spent building
+frames is absorbed instead of adding up. The async app awaits the delay
+instead of sleeping, so pacing never blocks a thread there.
+
+Configuration (environment variables):
+    AIRS_PACING               - default pacing spec (default "none")
+    AIRS_PACING_REPLAY_FILE   - recording used by the "replay" mode
+
+Per request: ?pace=<spec>, e.g. ?format=openai&pace=tps:40
+"""
+
+import json
+import os
+import time
+
+PACING_DEFAULT = os.getenv("AIRS_PACING", "none")
+PACING_REPLAY_FILE = os.getenv("AIRS_PACING_REPLAY_FILE", "")
+
+_replay_delays = None
+
+
+def _load_replay():
+    global _replay_delays
+    if _replay_delays is None:
+        if not PACING_REPLAY_FILE:
+            raise ValueError("replay pacing needs AIRS_PACING_REPLAY_FILE")
+        with open(PACING_REPLAY_FILE) as f:
+            delays = [float(ms) / 1000 for ms in json.load(f)]
+        if not delays:
+            raise ValueError(f"{PACING_REPLAY_FILE} has no recorded delays")
+        _replay_delays = delays
+    return _replay_delays
+
+
+class Pacer:
+    """Per-stream delay schedule; create one per request."""
+
+    def __init__(self, mode="none", value=0.0):
+        if mode not in ("none", "fixed", "tps", "replay"):
+            raise ValueError(f"unknown pacing mode: {mode}")
+        if mode in ("fixed", "tps") and value <= 0:
+            raise ValueError(f"{mode} pacing needs a positive value")
+        self.mode = mode
+        self.value = value
+        self._delays = _load_replay() if mode == "replay" else None
+        self._index = 0
+        self._next_at = None
+
+    @classmethod
+    def parse(cls, spec=None):
+        """Build a Pacer from a spec such as "none", "fixed:50" or "tps:40"."""
+        spec = (spec or PACING_DEFAULT).strip().lower()
+        mode, _, value = spec.partition(":")
+        return cls(mode, float(value) if value else 0.0)
+
+    def _interval(self, chunk):
+        if self.mode == "fixed":
+            return self.value / 1000
+        if self.mode == "tps":
+            return max(len(chunk.split()), 1) / self.value
+        return self._delays[min(self._index, len(self._delays) - 1)]
+
+    def _delay(self, chunk):
+        """Seconds to wait before sending the chunk after this one."""
+        if self.mode == "none":
+            return 0.0
+        now = time.monotonic()
+        if self._next_at is None:
+            self._next_at = now
+        self._next_at += self._interval(chunk)
+        self._index += 1
+        return max(self._next_at - now, 0.0)
+
+    def wait(self, chunk):
+        """Sleep after sending a chunk (sync generators)."""
+        delay = self._delay(chunk)
+        if delay:
+            time.sleep(delay)
+
+    async def async_wait(self, chunk):
+        """Await after sending a chunk without blocking the event loop."""
+        import asyncio  # only the aiohttp profile awaits
+
+        delay = self._delay(chunk)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def pacer_for_request(args):
+    """Pacer for the request's ?pace= parameter, falling back to AIRS_PACING."""
+    return Pacer.parse(args.get("pace"))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Structured, non-blocking request logging.
+
+The apps used to print several emoji lines per request straight to stdout
+from the request thread (or event loop), which serialises on the stdout lock
+and gets expensive at Red Team volumes. Events are now JSON objects put on a
+bounded in-memory queue; a background thread formats them and writes them in
+batches. When the queue is full new events are dropped and counted instead
+of blocking a request.
+
+Every request gets a trace ID (taken from an incoming X-Trace-Id header or
+generated), which is echoed back in the response header and used as the
+tr_id of its Runtime Security scans, so a log line, the client's view and
+the AIRS report all share one ID.
+
+Allow verdicts with nothing detected are the bulk of the volume and are
+sampled; blocks, detections and errors are always logged.
+
+Configuration (environment variables):
+    AIRS_LOG_LEVEL         - debug, info, warning or error (default info)
+    AIRS_LOG_FORMAT        - json or text (default json)
+    AIRS_LOG_FILE          - append to this file instead of stdout
+    AIRS_LOG_QUEUE         - max queued events before dropping (default 10000)
+    AIRS_LOG_SAMPLE_ALLOW  - fraction of clean allow verdicts logged (default 0.1)
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+LOG_LEVEL = LEVELS.get(os.getenv("AIRS_LOG_LEVEL", "info").lower(), 20)
+LOG_FORMAT = os.getenv("AIRS_LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("AIRS_LOG_FILE", "")
+LOG_QUEUE_SIZE = int(os.getenv("AIRS_LOG_QUEUE", "10000"))
+SAMPLE_ALLOW = float(os.getenv("AIRS_LOG_SAMPLE_ALLOW", "0.1"))
+
+TRACE_HEADER = "X-Trace-Id"
+
+_trace_id = contextvars.ContextVar("airs_trace_id", default=None)
+
+_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+_stats = {"logged": 0, "written": 0, "dropped": 0, "sampled_out": 0}
+
+
+def start_trace(incoming=None):
+    """Set the trace ID for the current request (thread or task) and return it."""
+    value = (incoming or "").strip()[:128] or str(uuid.uuid4())
+    _trace_id.set(value)
+    return value
+
+
+def trace_id():
+    """The current request's trace ID, or a fresh one outside a request."""
+    return _trace_id.get() or str(uuid.uuid4())
+
+
+def _ensure_writer():
+    global _writer, _writer_pid
+    # Started lazily so each gunicorn worker gets its own thread after fork
+    if _writer is not None and _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer_pid = os.getpid()
+            _writer = threading.Thread(target=_write_loop, name="request-log", daemon=True)
+            _writer.start()
+
+
+def log_event(event, level="info", **fields):
+    """Queue one structured event; never blocks the caller."""
+    if LEVELS.get(level, 20) < LOG_LEVEL:
+        return
+    record = {"ts": time.time(), "level": level, "event": event, "trace_id": _trace_id.get()}
+    record.update(fields)
+    _ensure_writer()
+    try:
+        _queue.put_nowait(record)
+        _stats["logged"] += 1
+    except queue.Full:
+        _stats["dropped"] += 1
+
+
+def log_verdict(stage, result, **fields):
+    """Log a scan verdict, sampling clean allow verdicts."""
+    category = result.get("category", "unknown")
+    action = result.get("action", "unknown")
+    detected = fields.get("detected")
+    # "queued": an alert-only scan handed to the background queue (scan_queue.py)
+    clean = action == "allow" and category in ("benign", "queued") and not detected
+    if clean and SAMPLE_ALLOW < 1.0 and random.random() >= SAMPLE_ALLOW:
+        _stats["sampled_out"] += 1
+        return
+    level = "info" if clean else "warning"
+    if category == "error":
+        fields["error"] = result.get("error")
+    log_event("scan.verdict", level, stage=stage, category=category, action=action, **fields)
+
+
+def _format(record):
+    ts = datetime.fromtimestamp(record.pop("ts"), timezone.utc).isoformat(timespec="milliseconds")
+    if LOG_FORMAT == "text":
+        head = f"{ts} {record.pop('level').upper():7} {record.pop('event')}"
+        rest = " ".join(f"{k}={v}" for k, v in record.items() if v is not None and k != "traceback")
+        text = f"{head} {rest}" if rest else head
+        if record.get("traceback"):
+            text += "\n" + record["traceback"].rstrip()
+        return text
+    return json.dumps(dict(ts=ts, **record), default=str)
+
+
+def _write_loop():
+    out = open(LOG_FILE, "a", encoding="utf-8") if LOG_FILE else sys.stdout
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < 512:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            out.write("".join(_format(r) + "\n" for r in batch))
+            out.flush()
+            _stats["written"] += len(batch)
+        except (OSError, ValueError):
+            _stats["dropped"] += len(batch)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+@atexit.register
+def _drain():
+    # Give the writer a moment to flush what is queued at shutdown
+    deadline = time.monotonic() + 2
+    while _writer is not None and _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def log_stats():
+    return dict(_stats, queued=_queue.qsize(), queue_size=LOG_QUEUE_SIZE,
+                sample_allow=SAMPLE_ALLOW)
+
+
+def trace_flask(app):
+    """Start a trace per Flask request and echo its ID in the response."""
+    from flask import request
+
+    @app.before_request
+    def _start_trace():
+        start_trace(request.headers.get(TRACE_HEADER))
+
+    @app.after_request
+    def _echo_trace(response):
+        response.headers[TRACE_HEADER] = trace_id()
+        return response
+
+
+def trace_middleware():
+    """aiohttp middleware doing what trace_flask does."""
+    from aiohttp import web
+
+    @web.middleware
+    async def trace(request, handler):
+        value = start_trace(request.headers.get(TRACE_HEADER))
+        response = await handler(request)
+        if not response.prepared:  # streamed responses already sent their headers
+            response.headers[TRACE_HEADER] = value
+        return response
+    return trace
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+OpenAI-shaped response bodies and block notices shared by the servers.
+"""
+
+import uuid
+from datetime import datetime
+
+from .config import MODEL_NAME
+
+BLOCKED_PROMPT = "⛔ This request was blocked by Prisma AIRS Runtime Security for violating security policies."
+BLOCKED_RESPONSE = "⛔ The model's response was blocked by security policies."
+
+
+def message_text(msg):
+    """Text of a chat message; content may be a string or a list of parts."""
+    content = msg.get("content")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content
+                         if isinstance(part, dict) and part.get("type", "text") == "text")
+    return content or ""
+
+
+def user_prompt(messages):
+    """Text of the first user message (see message_text), or None."""
+    for msg in messages:
+        if msg.get("role") == "user":
+            return message_text(msg)
+    return None
+
+
+def latest_user_prompt(messages):
+    """Text of the last user message (the turn being answered), or None."""
+    for msg in reversed(messages):
+        if msg.get("role") == "user":
+            return message_text(msg)
+    return None
+
+
+def completion_body(prompt, content, completion_tokens=None):
+    if completion_tokens is None:
+        completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-{uuid.uuid4()}",
+        "object": "chat.completion",
+        "created": int(datetime.now().timestamp()),
+        "model": MODEL_NAME,
+        "choices": [{
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": content
+            },
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt.split()) + completion_tokens
+        }
+    }
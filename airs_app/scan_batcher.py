@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Micro-batching scanner for Runtime Security.
+
+The sync endpoint (/v1/scan/sync/request) returns a single verdict per call,
+so several contents cannot share one sync request and still get their own
+verdicts back. The async endpoint does accept a list of scan requests, each
+tagged with a req_id, and reports a verdict per req_id. This module collects
+concurrent scans for a short window (or until a batch is full), submits them
+as one async request, polls for the results and hands each verdict back to
+the caller waiting on it.
+
+Batching trades a little latency (the window plus result polling) for fewer
+API submissions under burst load, so it is off by default.
+
+Configuration (environment variables):
+    AIRS_BATCH                - "true" to batch scans (default false)
+    AIRS_BATCH_WINDOW_MS      - how long to collect scans for a batch (default 10)
+    AIRS_BATCH_MAX_ITEMS      - max scans per batch request (default 5)
+    AIRS_BATCH_POLL_MS        - delay between result polls (default 50)
+    AIRS_BATCH_TIMEOUT        - seconds before a batch fails open (default 30)
+    AIRS_BATCH_DISPATCHERS    - batches that may be in flight at once (default 8)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .airs_session import get_session
+from .circuit_breaker import fail_result
+from .request_log import log_event
+
+BATCH_ENABLED = os.getenv("AIRS_BATCH", "false").lower() == "true"
+BATCH_WINDOW_MS = float(os.getenv("AIRS_BATCH_WINDOW_MS", "10"))
+BATCH_MAX_ITEMS = int(os.getenv("AIRS_BATCH_MAX_ITEMS", "5"))
+BATCH_POLL_MS = float(os.getenv("AIRS_BATCH_POLL_MS", "50"))
+BATCH_TIMEOUT = float(os.getenv("AIRS_BATCH_TIMEOUT", "30"))
+BATCH_DISPATCHERS = int(os.getenv("AIRS_BATCH_DISPATCHERS", "8"))
+
+
+class ScanBatcher:
+    """Collects concurrent scan requests and submits them as one batch."""
+
+    def __init__(self, api_url, api_key, window_ms=BATCH_WINDOW_MS,
+                 max_items=BATCH_MAX_ITEMS):
+        base = api_url.split("/v1/scan/")[0]
+        self.submit_url = base + "/v1/scan/async/request"
+        self.results_url = base + "/v1/scan/results"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "x-pan-token": api_key
+        }
+        self.window = window_ms / 1000
+        self.max_items = max_items
+
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.polls = 0
+        self.failures = 0
+
+        self._cond = threading.Condition()
+        self._pending = []  # [(scan_req, future)]
+        self._first_at = None
+        self._dispatch = ThreadPoolExecutor(max_workers=BATCH_DISPATCHERS,
+                                            thread_name_prefix="airs-batch")
+        self._thread = threading.Thread(target=self._collect, name="airs-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, scan_req):
+        """Queue one scan request; the returned Future resolves to its verdict.
+
+        The Future always resolves - with an AIRS_FAIL_MODE error result if the
+        batch cannot be scanned - so callers never need their own timeout.
+        """
+        future = Future()
+        with self._cond:
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((scan_req, future))
+            self._cond.notify()
+        return future
+
+    def scan(self, scan_req):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(scan_req).result()
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._first_at + self.window
+                while len(self._pending) < self.max_items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_items]
+                del self._pending[:self.max_items]
+                self._first_at = time.monotonic() if self._pending else None
+            self._dispatch.submit(self._send, batch)
+
+    def _send(self, batch):
+        import requests
+
+        futures = {req_id: future for req_id, (_, future) in enumerate(batch, 1)}
+        body = [{"req_id": req_id, "scan_req": scan_req}
+                for req_id, (scan_req, _) in enumerate(batch, 1)]
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        session = get_session()
+        error = "batch scan failed"
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+
+        try:
+            resp = session.post(self.submit_url, headers=self.headers, json=body,
+                                verify=False, timeout=BATCH_TIMEOUT)
+            resp.raise_for_status()
+            scan_id = resp.json()["scan_id"]
+
+            while futures and time.monotonic() < deadline:
+                time.sleep(BATCH_POLL_MS / 1000)
+                with self._stats_lock:
+                    self.polls += 1
+                resp = session.get(self.results_url, headers=self.headers,
+                                   params={"scan_ids": scan_id}, verify=False,
+                                   timeout=max(deadline - time.monotonic(), 1))
+                resp.raise_for_status()
+                for item in resp.json():
+                    if item.get("status") != "complete":
+                        continue
+                    future = futures.pop(item.get("req_id"), None)
+                    if future is not None:
+                        future.set_result(item.get("result") or {})
+            error = "batch scan timed out"
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            log_event("scan.error", "error", error=str(e), batch_size=len(batch))
+            error = str(e)
+        finally:
+            if futures:
+                with self._stats_lock:
+                    self.failures += 1
+            for future in futures.values():
+                if not future.done():
+                    future.set_result(fail_result(error))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "enabled": True,
+                "window_ms": self.window * 1000,
+                "max_items": self.max_items,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "submissions_saved": self.items - self.batches,
+                "polls": self.polls,
+                "failed_batches": self.failures,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(api_url, api_key):
+    """Return the process-wide batcher, or None when AIRS_BATCH is off."""
+    global _batcher
+    if not BATCH_ENABLED:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = ScanBatcher(api_url, api_key)
+    return _batcher
+
+
+def batch_stats():
+    """Return a JSON-serialisable snapshot of batching counters."""
+    return _batcher.stats() if _batcher else {"enabled": BATCH_ENABLED}
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Verdict cache for Runtime Security scans.
+
+Red Team campaigns resend the same attack prompts many times. Verdicts are
+cached by (profile, sha256(prompt), sha256(response)) in an in-process LRU
+with a TTL, and optionally in a SQLite file so several workers on the same
+host can share hits. Error (fail-open or fail-closed) results and queued
+placeholders for alert-only profiles are never cached.
+
+Configuration (environment variables):
+    AIRS_CACHE_ENABLED   - "false" to disable caching entirely (default true)
+    AIRS_CACHE_MAXSIZE   - max verdicts held in memory (default 10000)
+    AIRS_CACHE_TTL       - seconds a verdict stays valid (default 300)
+    AIRS_CACHE_DB        - path to a shared SQLite file (default: memory only)
+    AIRS_PROFILE_CACHE_MAXSIZE - max verdicts per extra security profile
+                                 (default: AIRS_CACHE_MAXSIZE)
+
+Each extra security profile served through X-AIRS-Profile gets its own
+in-memory partition, so a busy red-team target cannot evict another's
+verdicts. Partitions share the SQLite file; its keys already carry the
+profile name.
+
+Clients can skip the cache for a single request with the header
+"X-AIRS-Cache: bypass".
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_ENABLED = os.getenv("AIRS_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAXSIZE = int(os.getenv("AIRS_CACHE_MAXSIZE", "10000"))
+CACHE_TTL = float(os.getenv("AIRS_CACHE_TTL", "300"))
+CACHE_DB = os.getenv("AIRS_CACHE_DB", "")
+PROFILE_CACHE_MAXSIZE = int(os.getenv("AIRS_PROFILE_CACHE_MAXSIZE", str(CACHE_MAXSIZE)))
+
+CACHE_BYPASS_HEADER = "X-AIRS-Cache"
+
+# Prune the shared file every N writes rather than on every put
+_DB_PRUNE_EVERY = 500
+
+
+def _sha256(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def cache_allowed(headers):
+    """False when the client asked to bypass the cache for this request."""
+    return headers.get(CACHE_BYPASS_HEADER, "").lower() != "bypass"
+
+
+class _SharedBackend:
+    """SQLite-backed verdict store shared by every worker on the host."""
+
+    def __init__(self, path, maxrows):
+        self.path = path
+        self.maxrows = maxrows
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, verdict TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._conn().execute(
+            "SELECT verdict, expires FROM verdicts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None, (row[1] if row else 0.0)
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, verdict, expires):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO verdicts (key, verdict, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(verdict), expires),
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _DB_PRUNE_EVERY == 0
+        if prune:
+            conn.execute("DELETE FROM verdicts WHERE expires <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts"
+                " ORDER BY expires ASC LIMIT max((SELECT count(*) FROM verdicts) - ?, 0))",
+                (self.maxrows,),
+            )
+
+
+class VerdictCache:
+    """Thread-safe LRU/TTL cache of scan verdicts with hit/miss counters."""
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, db_path=CACHE_DB):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, verdict)
+        self._lock = threading.Lock()
+        self.shared = _SharedBackend(db_path, maxsize * 10) if db_path else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(profile, prompt, response=None):
+        return f"{profile}:{_sha256(prompt)}:{_sha256(response)}"
+
+    def get(self, key):
+        """Return a copy of the cached verdict, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.shared is not None:
+            try:
+                verdict, expires = self.shared.get(key, now)
+            except sqlite3.Error:
+                verdict = None
+            if verdict is not None:
+                self._store(key, verdict, expires)
+                with self._lock:
+                    self.shared_hits += 1
+                return dict(verdict)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, verdict):
+        """Cache a verdict AIRS returned; never a fail-mode fallback or a queued placeholder."""
+        # A cached placeholder would mark a conversation prefix as scanned for good
+        if verdict.get("category") in ("error", "queued"):
+            return
+        expires = time.time() + self.ttl
+        self._store(key, verdict, expires)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, verdict, expires)
+            except sqlite3.Error:
+                pass  # a locked/busy shared file must never fail a scan
+
+    def _store(self, key, verdict, expires):
+        with self._lock:
+            self._entries[key] = (expires, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "enabled": True,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "shared_backend": self.shared.path if self.shared else None,
+            }
+
+
+verdict_cache = VerdictCache() if CACHE_ENABLED else None
+_partitions = {}
+_partitions_lock = threading.Lock()
+
+
+def cache_partition(profile):
+    """The verdict cache partition for an extra security profile (None if disabled)."""
+    if verdict_cache is None:
+        return None
+    with _partitions_lock:
+        if profile not in _partitions:
+            partition = VerdictCache(maxsize=PROFILE_CACHE_MAXSIZE, db_path="")
+            partition.shared = verdict_cache.shared
+            _partitions[profile] = partition
+        return _partitions[profile]
+
+
+def cache_stats():
+    """Return a JSON-serialisable snapshot of the verdict cache."""
+    if not verdict_cache:
+        return {"enabled": False}
+    stats = verdict_cache.stats()
+    with _partitions_lock:
+        partitions = dict(_partitions)
+    if partitions:
+        stats["partitions"] = {name: p.stats() for name, p in sorted(partitions.items())}
+    return stats
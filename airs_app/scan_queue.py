@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Durable background scanning for alert-only security profiles.
+
+A security profile that only alerts, and never blocks, still made every
+request wait on /v1/scan/sync/request before the LLM ran. For the profiles
+in AIRS_ALERT_ONLY_PROFILES the apps no longer wait. Each prompt and
+response scan is committed to a local SQLite queue, and the request
+carries on as if the scan had allowed it. Background worker threads drain
+the queue through the normal scan path: pool, cache, admission and circuit
+breaker. Each scan runs under the request's tr_id, and its verdict is
+stored in the queue file for reporting and logged as a scan.verdict event.
+A conversation scan also records the conversation's prefix key, and the
+worker caches the verdict under it, so the next turn of that conversation
+queues only its new messages (see scanner.py).
+
+A job is committed before the request continues, so a crashed process
+loses nothing. A job that was claimed but never finished is claimed again
+once its lease runs out, by any process sharing the file; the slow worker
+it was taken from can then no longer record a result for it. Shed or failed
+scans are retried with backoff, up to AIRS_SCAN_QUEUE_MAX_ATTEMPTS.
+Finished jobs are kept for AIRS_SCAN_QUEUE_RETENTION_S, and a summary can
+be printed with:
+
+    python -m airs_app.scan_queue [airs_scan_queue.db]
+
+Only list profiles whose policy never blocks. A verdict that says "block"
+arrives after the response has already been served. For the same reason the
+stream guard is skipped for these profiles: a streamed response gets one
+queued response scan, not one per checkpoint. scan_corpus.py always scans
+in line, since its process exits before the queue could drain.
+
+Configuration (environment variables):
+    AIRS_ALERT_ONLY_PROFILES     - comma-separated security profiles scanned in the
+                                   background, or "*" for all (default: none)
+    AIRS_SCAN_QUEUE_DB           - queue file (default airs_scan_queue.db)
+    AIRS_SCAN_QUEUE_WORKERS      - drain threads per process (default 2)
+    AIRS_SCAN_QUEUE_LEASE_S      - seconds before an unfinished claimed job is retried (default 60)
+    AIRS_SCAN_QUEUE_MAX_ATTEMPTS - scan attempts before a job is marked failed (default 5)
+    AIRS_SCAN_QUEUE_RETENTION_S  - seconds finished jobs are kept (default 604800)
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from .metrics import METRICS_ENABLED, Counter, Histogram
+from .request_log import log_event, log_verdict, start_trace, trace_id
+
+ALERT_ONLY_PROFILES = {p.strip() for p in os.getenv("AIRS_ALERT_ONLY_PROFILES", "").split(",") if p.strip()}
+QUEUE_DB = os.getenv("AIRS_SCAN_QUEUE_DB", "airs_scan_queue.db")
+QUEUE_WORKERS = int(os.getenv("AIRS_SCAN_QUEUE_WORKERS", "2"))
+LEASE = float(os.getenv("AIRS_SCAN_QUEUE_LEASE_S", "60"))
+MAX_ATTEMPTS = int(os.getenv("AIRS_SCAN_QUEUE_MAX_ATTEMPTS", "5"))
+RETENTION = float(os.getenv("AIRS_SCAN_QUEUE_RETENTION_S", "604800"))
+
+# Jobs enqueued by other processes, and retries, are picked up this often
+_POLL_S = 1.0
+_PRUNE_EVERY_S = 300
+
+QUEUE_JOBS = Counter("airs_scan_queue_jobs_total", "Background scan jobs by outcome.", ("outcome",))
+QUEUE_LAG = Histogram("airs_scan_queue_lag_seconds", "Enqueue to recorded verdict, per job.")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS scan_jobs ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " tr_id TEXT, profile TEXT NOT NULL, stage TEXT NOT NULL, prompt TEXT, response TEXT,"
+    " state TEXT NOT NULL DEFAULT 'pending',"  # pending, running, done, failed
+    " attempts INTEGER NOT NULL DEFAULT 0,"
+    " enqueued REAL NOT NULL, available REAL NOT NULL, claimed REAL, finished REAL,"
+    " category TEXT, action TEXT, verdict TEXT, cache_key TEXT)",
+    "CREATE INDEX IF NOT EXISTS scan_jobs_ready ON scan_jobs (state, available)",
+)
+
+
+def alert_only(profile):
+    """True when a security profile's scans go through the background queue."""
+    return "*" in ALERT_ONLY_PROFILES or profile in ALERT_ONLY_PROFILES
+
+
+class ScanQueue:
+    """SQLite job table shared by every process using the same file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(scan_jobs)")}
+        if "cache_key" not in columns:
+            # Queue files from before conversation keys were recorded
+            try:
+                conn.execute("ALTER TABLE scan_jobs ADD COLUMN cache_key TEXT")
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, tr_id, profile, stage, prompt, response, cache_key=None):
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO scan_jobs (tr_id, profile, stage, prompt, response, enqueued, available, cache_key)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (tr_id, profile, stage, prompt, response, now, now, cache_key),
+        )
+        return cur.lastrowid
+
+    def claim(self):
+        """Lease the oldest ready job; returns a row dict or None."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, tr_id, profile, stage, prompt, response, attempts, enqueued, cache_key"
+                " FROM scan_jobs"
+                " WHERE (state = 'pending' AND available <= ?) OR (state = 'running' AND claimed < ?)"
+                " ORDER BY id LIMIT 1",
+                (now, now - LEASE),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE scan_jobs SET state = 'running', claimed = ?, attempts = attempts + 1"
+                    " WHERE id = ?", (now, row[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        keys = ("id", "tr_id", "profile", "stage", "prompt", "response", "attempts", "enqueued", "cache_key")
+        job = dict(zip(keys, row))
+        job["attempts"] += 1
+        job["claimed"] = now
+        return job
+
+    # finish, retry and fail only touch a job this worker still holds. After
+    # its lease ran out another worker may have claimed it again; they
+    # return False and leave that worker's state alone.
+
+    def finish(self, job, verdict):
+        cur = self._conn().execute(
+            "UPDATE scan_jobs SET state = 'done', finished = ?, category = ?, action = ?, verdict = ?"
+            " WHERE id = ? AND state = 'running' AND claimed = ?",
+            (time.time(), verdict.get("category"), verdict.get("action"), json.dumps(verdict),
+             job["id"], job["claimed"]),
+        )
+        return cur.rowcount == 1
+
+    def retry(self, job, delay, error):
+        cur = self._conn().execute(
+            "UPDATE scan_jobs SET state = 'pending', available = ?, verdict = ?"
+            " WHERE id = ? AND state = 'running' AND claimed = ?",
+            (time.time() + delay, json.dumps({"error": error}), job["id"], job["claimed"]),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job, error):
+        cur = self._conn().execute(
+            "UPDATE scan_jobs SET state = 'failed', finished = ?, category = 'error', verdict = ?"
+            " WHERE id = ? AND state = 'running' AND claimed = ?",
+            (time.time(), json.dumps({"error": error}), job["id"], job["claimed"]),
+        )
+        return cur.rowcount == 1
+
+    def prune(self):
+        self._conn().execute(
+            "DELETE FROM scan_jobs WHERE state IN ('done', 'failed') AND finished < ?",
+            (time.time() - RETENTION,),
+        )
+
+    def counts(self):
+        rows = self._conn().execute(
+            "SELECT state, COUNT(*), MIN(enqueued) FROM scan_jobs GROUP BY state").fetchall()
+        return {state: (n, oldest) for state, n, oldest in rows}
+
+    def report(self):
+        """Verdict counts by profile, stage, category and action."""
+        return self._conn().execute(
+            "SELECT profile, stage, COALESCE(category, state), COALESCE(action, '-'), COUNT(*),"
+            " AVG(finished - enqueued) FROM scan_jobs"
+            " GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 5 DESC").fetchall()
+
+
+_queue = None
+_workers_pid = None
+_lock = threading.Lock()
+_wake = threading.Event()
+_stats = {"enqueued": 0, "scanned": 0, "retried": 0, "failed": 0, "lease_lost": 0}
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = ScanQueue(QUEUE_DB)
+    return _queue
+
+
+def start_workers():
+    """Start this process's drain threads (once per process, so after a fork too)."""
+    global _workers_pid
+    if _workers_pid == os.getpid():
+        return
+    with _lock:
+        if _workers_pid == os.getpid():
+            return
+        _workers_pid = os.getpid()
+    get_queue()
+    for n in range(QUEUE_WORKERS):
+        threading.Thread(target=_work, name=f"scan-queue-{n}", daemon=True).start()
+
+
+def enqueue(profile, prompt, response=None, cache_key=None):
+    """Queue a scan and return a placeholder allow verdict for the request.
+
+    cache_key, if given, is where the worker caches the finished verdict.
+    """
+    start_workers()
+    stage = "response" if response else "prompt"
+    job_id = get_queue().put(trace_id(), profile, stage, prompt, response, cache_key)
+    with _lock:
+        _stats["enqueued"] += 1
+    _wake.set()
+    return {"category": "queued", "action": "allow", "queued_job": job_id,
+            "prompt_detected": {}, "response_detected": {}}
+
+
+def _outcome(outcome):
+    with _lock:
+        _stats[outcome] += 1
+    if METRICS_ENABLED:
+        QUEUE_JOBS.inc(outcome=outcome)
+
+
+def _run(job):
+    from .admission import Overloaded
+    from .scanner import detected_threats, get_scan_client
+
+    queue = get_queue()
+    start_trace(job["tr_id"])
+    client = get_scan_client(job["profile"])
+    try:
+        result = client.scan_now(job["prompt"], job["response"])
+        error = result.get("error") if result.get("category") == "error" else None
+    except Overloaded as e:
+        error = str(e)
+    except Exception as e:  # keep the worker alive; the job is retried
+        error = repr(e)
+
+    if error is None:
+        if not queue.finish(job, result):
+            _lease_lost(job)
+            return
+        if job["cache_key"] and client.cache is not None:
+            # The conversation's next turn now only queues what is new
+            client.cache.put(job["cache_key"], result)
+        lag = time.time() - job["enqueued"]
+        if METRICS_ENABLED:
+            QUEUE_LAG.observe(lag)
+        _outcome("scanned")
+        log_verdict(job["stage"], result, profile=job["profile"], queued_ms=round(lag * 1000),
+                    detected=detected_threats(result, f"{job['stage']}_detected"))
+    elif job["attempts"] >= MAX_ATTEMPTS:
+        if not queue.fail(job, error):
+            _lease_lost(job)
+            return
+        _outcome("failed")
+        log_event("scan_queue.failed", "error", job=job["id"], attempts=job["attempts"], error=error)
+    elif queue.retry(job, min(2 ** job["attempts"], 60), error):
+        _outcome("retried")
+    else:
+        _lease_lost(job)
+
+
+def _lease_lost(job):
+    # The scan outlived its lease and the job was claimed again; its result is dropped
+    _outcome("lease_lost")
+    log_event("scan_queue.lease_lost", "warning", job=job["id"], attempts=job["attempts"])
+
+
+def _work():
+    queue = get_queue()
+    pruned = 0.0
+    while True:
+        try:
+            job = queue.claim()
+        except sqlite3.Error as e:  # busy file; try again shortly
+            log_event("scan_queue.error", "warning", error=str(e))
+            job = None
+        if job is not None:
+            try:
+                _run(job)
+            except sqlite3.Error as e:
+                # The outcome was not recorded; the job is claimed again once its lease runs out
+                log_event("scan_queue.error", "warning", job=job["id"], error=str(e))
+            continue
+        if time.monotonic() - pruned > _PRUNE_EVERY_S:
+            pruned = time.monotonic()
+            try:
+                queue.prune()
+            except sqlite3.Error:
+                pass
+        _wake.wait(_POLL_S)
+        _wake.clear()
+
+
+def queue_stats():
+    if not ALERT_ONLY_PROFILES:
+        return {"enabled": False}
+    stats = {"enabled": True, "db": QUEUE_DB, "profiles": sorted(ALERT_ONLY_PROFILES),
+             "workers": QUEUE_WORKERS if _workers_pid == os.getpid() else 0}
+    with _lock:
+        stats.update(_stats)
+    try:
+        counts = get_queue().counts()
+    except sqlite3.Error:
+        return stats
+    for state in ("pending", "running", "done", "failed"):
+        stats[state] = counts.get(state, (0, None))[0]
+    oldest = counts.get("pending", (0, None))[1]
+    stats["oldest_pending_s"] = round(time.time() - oldest, 1) if oldest else 0.0
+    return stats
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else QUEUE_DB
+    if not os.path.exists(path):
+        sys.exit(f"❌ No scan queue at {path}")
+    rows = ScanQueue(path).report()
+    print(f"{'profile':20} {'stage':9} {'category':10} {'action':7} {'jobs':>7} {'lag s':>7}")
+    for profile, stage, category, action, n, lag in rows:
+        lag = f"{lag:.1f}" if lag is not None else "-"
+        print(f"{profile:20} {stage:9} {category:10} {action:7} {n:>7} {lag:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Runtime Security scan client used by every app profile and scan_corpus.py.
+
+scan_with_runtime_security() (threads) and ascan_with_runtime_security()
+(aiohttp) share one path: verdict cache, circuit breaker, admission slot,
+then either the micro-batcher or a direct sync scan call with the breaker's
+adaptive timeout, hedged past the observed p95 when hedging is on
+(hedging.py). Errors come back as AIRS_FAIL_MODE verdicts; a shed scan
+raises Overloaded.
+
+One deployment can front several red-team targets, each scanned with its
+own AIRS security profile. A request picks one with the X-AIRS-Profile
+header or the /profiles/<name>/v1/chat/completions route; without either it
+uses the app profile's. Every security profile gets a ScanClient with its
+own pooled connection, verdict cache partition, admission limiter and
+airs_profile_* metrics. The circuit breaker and micro-batcher stay shared:
+they protect the one AIRS endpoint and API key all profiles use.
+
+Requests are scanned as whole conversations, not just the first user
+message, so a jailbreak spread over several turns is seen too. Each message
+is hashed together with everything before it; the verdict for a
+conversation is cached under the hash of its last message. The next turn
+resends that history plus new messages, so only the new suffix is scanned:
+user/system/tool turns as the prompt, assistant turns as the response. A
+cached prefix that was blocked blocks the whole conversation. Only
+verdicts AIRS actually returned are cached for a prefix, never a queued
+placeholder or a fail-mode fallback. A single-message request sends exactly
+the payload it always did.
+
+The prompt has already been scanned by the time the response is, so the
+response scan sends only the response, under the same tr_id, and the
+prompt verdict's prompt_detected is merged into its result. A prompt that
+was never scanned (the prompt scan failed open) is still sent with the
+response.
+
+Security profiles in AIRS_ALERT_ONLY_PROFILES are not scanned in line:
+their scans go on the durable background queue in scan_queue.py and the
+request gets an allow verdict with category "queued" at once. A queued
+conversation scan carries its prefix key, and the worker caches the
+verdict under it once AIRS answers, so later turns queue only what is new.
+
+Configuration (environment variables):
+    AIRS_CONVERSATION_SCAN - "incremental" (default), "full" to rescan the whole
+                             history every turn, or "first" for only the first
+                             user message (the old behaviour)
+    AIRS_RESPONSE_SCAN - "response_only" (default) or "combined" to send the
+                         prompt with every response scan as before
+    AIRS_PROFILES      - comma-separated security profiles requests may select,
+                         or "*" for any (default: only the app profile's)
+    AIRS_MAX_PROFILES  - most security profiles served with "*" (default 32)
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack
+
+from .admission import get_limiter
+from .airs_session import PoolStats, build_session, get_session
+from .circuit_breaker import fail_result, get_breaker
+from .config import API_KEY, RUNTIME_API_URL, get_profile
+from .hedging import hedger
+from .metrics import (  # detected_threats stays importable from here
+    CONVERSATION_MESSAGES, METRICS_ENABLED, PROFILE_SCANS, PROFILE_SECONDS, PROMPT_BYTES_SKIPPED, RESPONSE_SCANS,
+    detected_threats, observe_scan
+)
+from .request_log import log_event, trace_id
+from .responses import message_text, user_prompt
+from .scan_batcher import get_batcher
+from .scan_cache import cache_partition, verdict_cache
+from .scan_queue import alert_only, enqueue
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "x-pan-token": API_KEY
+}
+
+CONVERSATION_SCAN = os.getenv("AIRS_CONVERSATION_SCAN", "incremental").lower()
+RESPONSE_SCAN = os.getenv("AIRS_RESPONSE_SCAN", "response_only").lower()
+
+PROFILE_HEADER = "X-AIRS-Profile"
+ALLOWED_PROFILES = {p.strip() for p in os.getenv("AIRS_PROFILES", "").split(",") if p.strip()}
+MAX_PROFILES = int(os.getenv("AIRS_MAX_PROFILES", "32"))
+_PROFILE_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+scan_batcher = get_batcher(RUNTIME_API_URL, API_KEY)
+scan_breaker = get_breaker()
+
+# Set by the app factory; scans outside an app use AIRS_APP_PROFILE's default
+PROFILE_NAME = get_profile().security_profile
+
+
+class UnknownProfile(Exception):
+    """A request selected a security profile this deployment does not serve."""
+
+    status = 404
+
+    def __init__(self, name, reason="not allowed"):
+        self.name = name
+        super().__init__(f"AIRS security profile {name!r} {reason}")
+
+
+def _conversation(messages):
+    """(role, text) of each message that has text, in order."""
+    parts = [(msg.get("role", "user"), message_text(msg)) for msg in messages if isinstance(msg, dict)]
+    return [(role, text) for role, text in parts if text]
+
+
+def _prefix_hashes(parts):
+    """Hash of each message chained with all messages before it."""
+    hashes, digest = [], ""
+    for role, text in parts:
+        digest = hashlib.sha256(f"{digest}\0{role}\0{text}".encode("utf-8")).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+def _scan_contents(parts):
+    """Prompt and response text for a run of messages."""
+    prompt = "\n\n".join(text for role, text in parts if role != "assistant")
+    response = "\n\n".join(text for role, text in parts if role == "assistant")
+    return prompt or None, response or None
+
+
+def _blocked(verdict):
+    return verdict.get("category") == "malicious" or verdict.get("action") == "block"
+
+
+def _count_messages(scanned, reused):
+    if METRICS_ENABLED:
+        CONVERSATION_MESSAGES.inc(scanned, outcome="scanned")
+        if reused:
+            CONVERSATION_MESSAGES.inc(reused, outcome="reused")
+
+
+def _reuses_prompt_verdict(prompt_verdict):
+    """True when a response scan can skip the prompt (see AIRS_RESPONSE_SCAN)."""
+    return (RESPONSE_SCAN == "response_only" and prompt_verdict is not None
+            and prompt_verdict.get("category") != "error")
+
+
+def _count_response_scan(prompt, response_only):
+    if METRICS_ENABLED:
+        RESPONSE_SCANS.inc(mode="response_only" if response_only else "combined")
+        if response_only:
+            PROMPT_BYTES_SKIPPED.inc(len(prompt.encode("utf-8")))
+
+
+class ScanClient:
+    """Scans for one AIRS security profile with its own pool, cache and limiter."""
+
+    def __init__(self, profile, default=False):
+        self.profile = profile
+        self.default = default
+        self.alert_only = alert_only(profile)
+        self.scans = 0
+        self._lock = threading.Lock()
+        if default:
+            # The app profile keeps the process-wide pool, cache and limiter
+            self.pool_stats = None
+            self.cache = verdict_cache
+            self.limiters = ("scan",)
+        else:
+            self.pool_stats = PoolStats()
+            self.cache = cache_partition(profile)
+            self.limiters = (f"profile:{profile}", "scan")
+        self._session = None
+
+    def session(self):
+        if self.default:
+            return get_session()
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = build_session(self.pool_stats)
+        return self._session
+
+    def _payload(self, prompt, response):
+        # Response-only scans share the prompt scan's tr_id, so AIRS reports link up
+        content = {} if prompt is None else {"prompt": prompt}
+        if response:
+            content["response"] = response
+        return {
+            "tr_id": trace_id(),  # ties the AIRS report to this request's logs
+            "ai_profile": {"profile_name": self.profile},
+            "contents": [content]
+        }
+
+    def _conversation_key(self, prefix_hash):
+        return f"{self.profile}:conversation:{prefix_hash}"
+
+    def _conversation_cache(self, use_cache):
+        """The cache for prefix verdicts, or None when conversations scan whole."""
+        if CONVERSATION_SCAN != "incremental" or not use_cache:
+            return None
+        return self.cache
+
+    def scan_messages(self, messages, use_cache=True):
+        """Scan a chat conversation, reusing the verdict for the part already seen."""
+        started = time.perf_counter()
+        parts = _conversation(messages)
+        if CONVERSATION_SCAN == "first" or not parts:
+            return self._observe(started, self._scan(user_prompt(messages), None, use_cache))
+
+        cache = self._conversation_cache(use_cache)
+        hashes = _prefix_hashes(parts)
+        start = 0
+        if cache is not None:
+            for i in range(len(hashes) - 1, -1, -1):
+                cached = cache.get(self._conversation_key(hashes[i]))
+                if cached is None:
+                    continue
+                if i == len(hashes) - 1 or _blocked(cached):
+                    _count_messages(0, len(parts))
+                    return self._observe(started, cached)
+                start = i + 1
+                break
+
+        prompt, response = _scan_contents(parts[start:])
+        key = self._conversation_key(hashes[-1]) if cache is not None else None
+        result = self._scan(prompt, response, use_cache, key)
+        _count_messages(len(parts) - start, start)
+        if key:
+            cache.put(key, result)
+        return self._observe(started, result)
+
+    async def ascan_messages(self, session, messages, use_cache=True):
+        started = time.perf_counter()
+        parts = _conversation(messages)
+        if CONVERSATION_SCAN == "first" or not parts:
+            return self._observe(started, await self._ascan(session, user_prompt(messages), None, use_cache))
+
+        cache = self._conversation_cache(use_cache)
+        hashes = _prefix_hashes(parts)
+        start = 0
+        if cache is not None:
+            for i in range(len(hashes) - 1, -1, -1):
+                cached = await _cache_call(cache.get, self._conversation_key(hashes[i]))
+                if cached is None:
+                    continue
+                if i == len(hashes) - 1 or _blocked(cached):
+                    _count_messages(0, len(parts))
+                    return self._observe(started, cached)
+                start = i + 1
+                break
+
+        prompt, response = _scan_contents(parts[start:])
+        key = self._conversation_key(hashes[-1]) if cache is not None else None
+        result = await self._ascan(session, prompt, response, use_cache, key)
+        _count_messages(len(parts) - start, start)
+        if key:
+            await _cache_call(cache.put, key, result)
+        return self._observe(started, result)
+
+    def _observe(self, started, result):
+        with self._lock:
+            self.scans += 1
+        if METRICS_ENABLED:
+            PROFILE_SECONDS.observe(time.perf_counter() - started, profile=self.profile)
+            PROFILE_SCANS.inc(profile=self.profile, category=result.get("category", "unknown"),
+                              action=result.get("action", "unknown"))
+        return result
+
+    def scan(self, prompt, response=None, use_cache=True, prompt_verdict=None):
+        started = time.perf_counter()
+        if not response:
+            return self._observe(started, self._scan(prompt, None, use_cache))
+        response_only = _reuses_prompt_verdict(prompt_verdict)
+        _count_response_scan(prompt, response_only)
+        if not response_only:
+            return self._observe(started, self._scan(prompt, response, use_cache))
+        result = self._scan(None, response, use_cache)
+        return self._observe(started, dict(result, prompt_detected=prompt_verdict.get("prompt_detected", {})))
+
+    def _scan(self, prompt, response, use_cache, conversation_key=None):
+        if self.alert_only:
+            # The worker caches the verdict under conversation_key (see scan_queue.py)
+            return enqueue(self.profile, prompt, response, conversation_key)
+        return self.scan_now(prompt, response, use_cache)
+
+    def scan_now(self, prompt, response=None, use_cache=True):
+        """Scan in line, even for an alert-only profile (the queue workers use this)."""
+        cache = self.cache
+        cache_key = None
+        if use_cache and cache is not None:
+            cache_key = cache.key(self.profile, prompt, response)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        payload = self._payload(prompt, response)
+
+        # While AIRS is failing, answer at once instead of waiting out a timeout
+        if not scan_breaker.allow():
+            return scan_breaker.fallback()
+
+        # Cache hits never get here. A shed scan raises Overloaded, so the
+        # request is rejected rather than failed open
+        import requests
+
+        with ExitStack() as slots:
+            for name in self.limiters:
+                slots.enter_context(get_limiter(name).slot())
+            if scan_batcher is not None:
+                # Coalesced with other in-flight scans into one async batch request
+                result = scan_batcher.scan(payload)
+                if result.get("category") == "error":
+                    scan_breaker.record_failure()
+                else:
+                    scan_breaker.record_success()
+                    if cache_key:
+                        cache.put(cache_key, result)
+                return result
+
+            start = time.perf_counter()
+            try:
+                def post():
+                    # Make API call with SSL verification disabled (testing only!)
+                    resp = self.session().post(
+                        RUNTIME_API_URL,
+                        headers=HEADERS,
+                        json=payload,
+                        verify=False,  # Disable SSL verification for testing
+                        timeout=scan_breaker.timeout()
+                    )
+                    resp.raise_for_status()
+                    return resp.json()
+
+                result = hedger.call(post)
+                scan_breaker.record_success(time.perf_counter() - start)
+                if cache_key:
+                    cache.put(cache_key, result)
+                return result
+
+            except requests.exceptions.RequestException as e:
+                scan_breaker.record_failure()
+                log_event("scan.error", "error", error=str(e), profile=self.profile)
+                return fail_result(str(e))
+
+    async def ascan(self, session, prompt, response=None, use_cache=True, prompt_verdict=None):
+        started = time.perf_counter()
+        if not response:
+            return self._observe(started, await self._ascan(session, prompt, None, use_cache))
+        response_only = _reuses_prompt_verdict(prompt_verdict)
+        _count_response_scan(prompt, response_only)
+        if not response_only:
+            return self._observe(started, await self._ascan(session, prompt, response, use_cache))
+        result = await self._ascan(session, None, response, use_cache)
+        return self._observe(started, dict(result, prompt_detected=prompt_verdict.get("prompt_detected", {})))
+
+    async def _ascan(self, session, prompt, response, use_cache, conversation_key=None):
+        import asyncio
+
+        if self.alert_only:
+            # One SQLite commit; keep it off the event loop
+            return await asyncio.get_running_loop().run_in_executor(
+                None, enqueue, self.profile, prompt, response, conversation_key)
+
+        import aiohttp
+
+        cache = self.cache
+        cache_key = None
+        if use_cache and cache is not None:
+            cache_key = cache.key(self.profile, prompt, response)
+            cached = await _cache_call(cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        payload = self._payload(prompt, response)
+
+        # While AIRS is failing, answer at once instead of waiting out a timeout
+        if not scan_breaker.allow():
+            return scan_breaker.fallback()
+
+        # Cache hits never get here. A shed scan raises Overloaded, so the
+        # request is rejected rather than failed open
+        async with AsyncExitStack() as slots:
+            for name in self.limiters:
+                await slots.enter_async_context(get_limiter(name, asynchronous=True).slot())
+            if scan_batcher is not None:
+                # Coalesced with other in-flight scans into one async batch request
+                result = await asyncio.wrap_future(scan_batcher.submit(payload))
+                if result.get("category") == "error":
+                    scan_breaker.record_failure()
+                else:
+                    scan_breaker.record_success()
+                    if cache_key:
+                        await _cache_call(cache.put, cache_key, result)
+                return result
+
+            start = time.perf_counter()
+            try:
+                async def post():
+                    async with session.post(RUNTIME_API_URL, headers=HEADERS, json=payload,
+                                            timeout=aiohttp.ClientTimeout(total=scan_breaker.timeout())) as resp:
+                        resp.raise_for_status()
+                        return await resp.json()
+
+                result = await hedger.acall(post)
+                scan_breaker.record_success(time.perf_counter() - start)
+                if cache_key:
+                    await _cache_call(cache.put, cache_key, result)
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                scan_breaker.record_failure()
+                log_event("scan.error", "error", error=repr(e), profile=self.profile)
+                return fail_result(str(e) or type(e).__name__)
+
+    def stats(self):
+        # Cache partitions and limiters report under verdict_cache and admission
+        stats = {"default": self.default, "scans": self.scans}
+        if self._session is not None:  # the aiohttp app pools per profile itself
+            stats["connection_pool"] = self.pool_stats.snapshot()
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def set_security_profile(name):
+    global PROFILE_NAME
+    with _clients_lock:
+        PROFILE_NAME = name
+        _clients.clear()
+
+
+def get_scan_client(name=None):
+    """The ScanClient for a security profile (default: the app profile's)."""
+    name = name or PROFILE_NAME
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = ScanClient(name, default=name == PROFILE_NAME)
+    return client
+
+
+def profile_requested(headers, path_profile=None):
+    """The security profile a request selected, or None for the app profile's.
+
+    Raises UnknownProfile unless it is in AIRS_PROFILES (or that is "*").
+    """
+    name = (path_profile or headers.get(PROFILE_HEADER, "")).strip()
+    if not name or name == PROFILE_NAME:
+        return None
+    if not _PROFILE_RE.match(name):
+        raise UnknownProfile(name, "is not a valid profile name")
+    if "*" in ALLOWED_PROFILES:
+        if name not in _clients and len(_clients) >= MAX_PROFILES:
+            raise UnknownProfile(name, f"not served: AIRS_MAX_PROFILES={MAX_PROFILES} reached")
+    elif name not in ALLOWED_PROFILES:
+        raise UnknownProfile(name, "is not in AIRS_PROFILES")
+    return name
+
+
+def profile_stats():
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in sorted(clients.items())}
+
+
+@observe_scan
+def scan_with_runtime_security(prompt, response=None, use_cache=True, profile=None, prompt_verdict=None):
+    """
+    Scan prompt (and optionally response) using Runtime Security API.
+
+    Returns dict with:
+        - category: "benign" or "malicious"
+        - action: "allow", "alert", or "block"
+        - prompt_detected: dict of threat types
+        - response_detected: dict of threat types (if response provided)
+
+    profile selects the AIRS security profile (default: the app profile's).
+    Pass the prompt's verdict as prompt_verdict to scan a response without
+    re-sending the prompt.
+    """
+    return get_scan_client(profile).scan(prompt, response, use_cache, prompt_verdict)
+
+
+@observe_scan
+def scan_conversation(messages, use_cache=True, profile=None):
+    """Scan a request's messages as a conversation (see AIRS_CONVERSATION_SCAN)."""
+    return get_scan_client(profile).scan_messages(messages, use_cache)
+
+
+@observe_scan
+async def ascan_conversation(session, messages, use_cache=True, profile=None):
+    """Scan a request's messages as a conversation without blocking."""
+    return await get_scan_client(profile).ascan_messages(session, messages, use_cache)
+
+
+async def _cache_call(fn, *args):
+    import asyncio
+
+    # The shared SQLite backend does file I/O; keep it off the event loop
+    if verdict_cache.shared is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+@observe_scan
+async def ascan_with_runtime_security(session, prompt, response=None, use_cache=True, profile=None,
+                                      prompt_verdict=None):
+    """Scan prompt/response using Runtime Security API without blocking."""
+    return await get_scan_client(profile).ascan(session, prompt, response, use_cache, prompt_verdict)
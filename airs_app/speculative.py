@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Speculative LLM generation that overlaps the prompt scan.
+
+chat_completions normally runs prompt scan -> LLM call -> response scan, so
+latency is the sum of all three. In speculative mode the LLM call starts at
+the same time as the prompt scan; if the scan blocks the prompt, the
+generation is thrown away, otherwise its result is used as-is. The time the
+LLM spent working while the scan was still running is reported as saved.
+
+Configuration (environment variables):
+    AIRS_SPECULATIVE          - "true" to speculate on every request (default false)
+    AIRS_SPECULATIVE_WORKERS  - threads available for speculative calls (default 16)
+
+Clients can opt in or out per request with "X-AIRS-Speculative: on|off".
+The saving is returned in the "X-Speculative-Saved-Ms" response header.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SPECULATIVE_ENABLED = os.getenv("AIRS_SPECULATIVE", "false").lower() == "true"
+SPECULATIVE_WORKERS = int(os.getenv("AIRS_SPECULATIVE_WORKERS", "16"))
+
+SPECULATIVE_HEADER = "X-AIRS-Speculative"
+SAVED_MS_HEADER = "X-Speculative-Saved-Ms"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def speculation_requested(headers):
+    """Per-request override of AIRS_SPECULATIVE via the X-AIRS-Speculative header."""
+    value = headers.get(SPECULATIVE_HEADER, "").lower()
+    if value in ("on", "true", "1"):
+        return True
+    if value in ("off", "false", "0"):
+        return False
+    return SPECULATIVE_ENABLED
+
+
+class SpeculationStats:
+    """Thread-safe counters for used/discarded generations and time saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+        self.saved_ms_total = 0.0
+
+    def record_start(self):
+        with self._lock:
+            self.started += 1
+
+    def record_used(self, saved_ms):
+        with self._lock:
+            self.used += 1
+            self.saved_ms_total += saved_ms
+
+    def record_discarded(self):
+        with self._lock:
+            self.discarded += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled_by_default": SPECULATIVE_ENABLED,
+                "started": self.started,
+                "used": self.used,
+                "discarded": self.discarded,
+                "saved_ms_total": round(self.saved_ms_total, 1),
+                "saved_ms_avg": round(self.saved_ms_total / self.used, 1) if self.used else 0.0,
+            }
+
+
+stats = SpeculationStats()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=SPECULATIVE_WORKERS,
+                    thread_name_prefix="speculative-llm"
+                )
+    return _executor
+
+
+def _timed(fn, args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+class Speculation:
+    """An LLM call running on a worker thread while the prompt scan runs."""
+
+    def __init__(self, fn, *args):
+        stats.record_start()
+        self._future = _get_executor().submit(contextvars.copy_context().run, _timed, fn, args)
+        self.saved_ms = 0.0
+
+    def result(self):
+        """Wait for the generation and record how much of it overlapped the scan."""
+        wait_start = time.perf_counter()
+        value, llm_ms = self._future.result()
+        waited_ms = (time.perf_counter() - wait_start) * 1000
+        self.saved_ms = max(llm_ms - waited_ms, 0.0)
+        stats.record_used(self.saved_ms)
+        return value
+
+    def discard(self):
+        """Drop the generation after a block verdict. A call already in flight
+        finishes on its worker thread but its output is never used."""
+        self._future.cancel()
+        stats.record_discarded()
+
+
+class AsyncSpeculation:
+    """An LLM coroutine running as a task while the prompt scan is awaited."""
+
+    def __init__(self, coro):
+        import asyncio
+
+        stats.record_start()
+        self._started = time.perf_counter()
+        self._task = asyncio.ensure_future(self._timed(coro))
+        self.saved_ms = 0.0
+
+    async def _timed(self, coro):
+        result = await coro
+        return result, (time.perf_counter() - self._started) * 1000
+
+    async def result(self):
+        wait_start = time.perf_counter()
+        value, llm_ms = await self._task
+        waited_ms = (time.perf_counter() - wait_start) * 1000
+        self.saved_ms = max(llm_ms - waited_ms, 0.0)
+        stats.record_used(self.saved_ms)
+        return value
+
+    def discard(self):
+        """Cancel the generation task after a block verdict."""
+        self._task.cancel()
+        stats.record_discarded()
+
+
+def speculative_stats():
+    """Return a JSON-serialisable snapshot of speculative execution counters."""
+    return stats.snapshot()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Precompiled stream frame encoders.
+
+The stream generators used to rebuild a full dict (id, object, created,
+model, choices) for every chunk, run json.dumps on it and call
+datetime.now() each time. Here each stream builds its constant prefix and
+suffix bytes once; a frame is prefix + escaped delta + suffix. The delta is
+escaped with the same C routine json.dumps uses (ensure_ascii), so frames
+are byte-for-byte what json.dumps produced, and the output is bytes ready
+for the socket.
+
+See benchmarks/bench_sse_frames.py for the per-frame cost against the old
+dict + json.dumps approach.
+"""
+
+import json
+import time
+import uuid
+from json.encoder import encode_basestring_ascii
+
+MARKER = "\x00delta\x00"
+
+DONE_FRAME = b"data: [DONE]\n\n"
+
+
+def split_template(obj, prefix="", suffix=""):
+    """Dump obj once and split it into bytes around the MARKER string value.
+
+    Templates must contain MARKER exactly once, as the value to splice in.
+    """
+    text = prefix + json.dumps(obj) + suffix
+    head, tail = text.split(json.dumps(MARKER))
+    return head.encode("ascii"), tail.encode("ascii")
+
+
+def escape_text(text):
+    """Escape text as a quoted JSON string, exactly as json.dumps would."""
+    return encode_basestring_ascii(text).encode("ascii")
+
+
+class OpenAIFrames:
+    """chat.completion.chunk SSE frames for one stream (shared id/created/model)."""
+
+    def __init__(self, model, chunk_id=None, created=None):
+        base = {
+            "id": chunk_id or f"chatcmpl-{uuid.uuid4()}",
+            "object": "chat.completion.chunk",
+            "created": int(created if created is not None else time.time()),
+            "model": model,
+        }
+        self._head, self._tail = split_template(
+            dict(base, choices=[{"index": 0, "delta": {"content": MARKER}, "finish_reason": None}]),
+            "data: ", "\n\n")
+        self._finish_head, self._finish_tail = split_template(
+            dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": MARKER}]),
+            "data: ", "\n\n")
+
+    def delta(self, text):
+        return self._head + escape_text(text) + self._tail
+
+    def finish(self, finish_reason="stop"):
+        return self._finish_head + escape_text(finish_reason) + self._finish_tail
+
+
+class TextDeltaFrames:
+    """AI SDK style text-delta SSE frames."""
+
+    START = (b'data: {"type":"start"}\n\n'
+             b'data: {"type":"start-step"}\n\n'
+             b'data: {"type":"text-start","id":"0"}\n\n')
+    END = (b'data: {"type":"text-end","id":"0"}\n\n'
+           b'data: {"type":"finish-step"}\n\n'
+           b'data: {"type":"finish"}\n\n' + DONE_FRAME)
+
+    _head, _tail = split_template({"type": "text-delta", "id": "0", "delta": MARKER},
+                                  "data: ", "\n\n")
+
+    def delta(self, text):
+        return self._head + escape_text(text) + self._tail
+
+
+class NDJSONFrames:
+    """Newline-delimited JSON frames (no SSE 'data: ' prefix)."""
+
+    DONE = json.dumps({"type": "done"}).encode("ascii") + b"\n"
+
+    _head, _tail = split_template({"type": "text-delta", "id": "0", "delta": MARKER},
+                                  "", "\n")
+
+    def delta(self, text):
+        return self._head + escape_text(text) + self._tail
+
+
+class AnthropicFrames:
+    """Anthropic Messages API stream events (message_start ... message_stop)."""
+
+    _FINISH_REASONS = {"stop": "end_turn", "length": "max_tokens", "content_filter": "refusal"}
+
+    def __init__(self, model, message_id=None):
+        message = {
+            "id": message_id or f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+        self.start_events = (
+            b"event: message_start\ndata: "
+            + json.dumps({"type": "message_start", "message": message}).encode("ascii")
+            + b"\n\nevent: content_block_start\ndata: "
+            + b'{"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}'
+            + b"\n\n"
+        )
+
+    _head, _tail = split_template(
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": MARKER}},
+        "event: content_block_delta\ndata: ", "\n\n")
+
+    def delta(self, text):
+        return self._head + escape_text(text) + self._tail
+
+    def finish(self, finish_reason="stop", output_tokens=0):
+        message_delta = {
+            "type": "message_delta",
+            "delta": {"stop_reason": self._FINISH_REASONS.get(finish_reason, finish_reason),
+                      "stop_sequence": None},
+            "usage": {"output_tokens": output_tokens}
+        }
+        return (
+            b'event: content_block_stop\ndata: {"type": "content_block_stop", "index": 0}\n\n'
+            b"event: message_delta\ndata: "
+            + json.dumps(message_delta).encode("ascii")
+            + b'\n\nevent: message_stop\ndata: {"type": "message_stop"}\n\n'
+        )
+
+
+class GeminiFrames:
+    """Gemini streamGenerateContent (alt=sse) frames."""
+
+    _FINISH_REASONS = {"stop": "STOP", "length": "MAX_TOKENS", "content_filter": "SAFETY"}
+
+    _head, _tail = split_template(
+        {"candidates": [{"content": {"parts": [{"text": MARKER}], "role": "model"}, "index": 0}]},
+        "data: ", "\n\n")
+    _finish_head, _finish_tail = split_template(
+        {"candidates": [{"content": {"parts": [{"text": ""}], "role": "model"},
+                         "finishReason": MARKER, "index": 0}]},
+        "data: ", "\n\n")
+
+    def delta(self, text):
+        return self._head + escape_text(text) + self._tail
+
+    def finish(self, finish_reason="stop"):
+        reason = self._FINISH_REASONS.get(finish_reason, finish_reason.upper())
+        return self._finish_head + escape_text(reason) + self._finish_tail
+
+
+_simple_head, _simple_tail = split_template({"output": MARKER}, "data: ", "\n\n")
+
+
+def simple_json_frame(text):
+    """Single SSE frame carrying the whole output."""
+    return _simple_head + escape_text(text) + _simple_tail
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cold-start timing and AIRS connection prewarm.
+
+Cloud Run counts a cold start against the first red-team request's
+timeout. With AIRS_FAST_START=true (set in Dockerfile.cloudrun) each worker
+opens its first AIRS connection on a background thread while the server
+modules import, and create_app() only returns once that connection sits in
+the pool. The worker starts accepting after that, so the first scan skips
+DNS, TCP and TLS setup. requests/urllib3 are loaded on that thread too; the
+Flask profiles no longer import them at module level.
+
+Each phase is timed from process start (the serve.py launcher's, when
+there is one) and reported once as a startup.ready log event, under
+"startup" in /health and as airs_startup_* gauges:
+
+    interpreter    - Python, site-packages and the launcher, up to airs_app
+    modules        - server and scan modules imported
+    app            - routes, metrics and logging set up
+    prewarm        - AIRS connection open (AIRS_FAST_START only)
+    ready          - create_app() returned / event loop started
+    first_request  - first request received
+
+Configuration (environment variables):
+    AIRS_FAST_START         - "true" to prewarm the AIRS connection (default false)
+    AIRS_PREWARM_TIMEOUT_S  - longest to wait for the prewarm before serving anyway (default 5)
+"""
+
+import os
+import threading
+import time
+
+from .request_log import log_event
+
+FAST_START = os.getenv("AIRS_FAST_START", "false").lower() == "true"
+PREWARM_TIMEOUT = float(os.getenv("AIRS_PREWARM_TIMEOUT_S", "5"))
+# Exported by serve.py so gunicorn workers time from the launcher's start
+START_ENV = "AIRS_PROCESS_START"
+
+
+def process_start_time():
+    """Wall-clock time this process started (from /proc on Linux)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the ")" that ends the command name; starttime is field 22
+            started = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+def _start_time():
+    try:
+        return float(os.environ[START_ENV])
+    except (KeyError, ValueError):
+        return process_start_time()
+
+
+PROCESS_START = _start_time()
+_marks = {}
+_lock = threading.Lock()
+_prewarm = None
+_prewarm_error = None
+
+
+def mark(phase):
+    """Record when a phase finished, in ms since process start; False if already recorded."""
+    with _lock:
+        if phase in _marks:
+            return False
+        _marks[phase] = round((time.time() - PROCESS_START) * 1000, 1)
+        return True
+
+
+def _warm():
+    global _prewarm_error
+    try:
+        from .airs_session import get_session
+        from .config import AIRS_API_URL
+
+        # Any answer will do; the body is read, so the connection stays pooled
+        get_session().get(f"{AIRS_API_URL}/", timeout=PREWARM_TIMEOUT, verify=False)
+    except Exception as e:  # the first scan just opens its own connection
+        _prewarm_error = str(e)
+
+
+def start_prewarm():
+    """Open the AIRS connection in the background (AIRS_FAST_START only)."""
+    global _prewarm
+    if FAST_START and _prewarm is None:
+        _prewarm = threading.Thread(target=_warm, name="airs-prewarm", daemon=True)
+        _prewarm.start()
+
+
+def wait_for_prewarm():
+    if _prewarm is not None:
+        _prewarm.join(PREWARM_TIMEOUT)
+        mark("prewarm")
+
+
+async def aprewarm(session, url):
+    """Open a connection in an aiohttp session's pool (AIRS_FAST_START only)."""
+    global _prewarm_error
+    if not FAST_START:
+        return
+    try:
+        import aiohttp
+
+        async with session.get(f"{url}/", timeout=aiohttp.ClientTimeout(total=PREWARM_TIMEOUT)) as resp:
+            await resp.read()
+    except Exception as e:
+        _prewarm_error = repr(e)
+    mark("prewarm")
+
+
+def ready():
+    """Mark the app as ready to serve and log the startup report."""
+    if mark("ready"):
+        log_event("startup.ready", fast_start=FAST_START, prewarm_error=_prewarm_error, **_marks)
+
+
+def first_request():
+    if "first_request" not in _marks and mark("first_request"):
+        log_event("startup.first_request", ms=_marks["first_request"])
+
+
+def startup_stats():
+    with _lock:
+        stats = {f"{phase}_ms": ms for phase, ms in _marks.items()}
+    stats["fast_start"] = FAST_START
+    if _prewarm_error:
+        stats["prewarm_error"] = _prewarm_error
+    return stats
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Streaming format registry.
+
+Each ?format= value maps to a StreamFormat plugin that turns text chunks
+into wire frames. chat_completions picks the plugin once per request and
+hands it to stream_frames() (or astream_frames() in the async app) together
+with the content: a finished string, which is chunked lazily, or any chunk
+iterator such as a StreamGuard or an upstream TokenStream. Word chunks are
+joined with spaces; an iterator with separator = "" (upstream tokens, which
+carry their own whitespace) is passed through as is. A buffered format
+(simple) gets a finished string whole, so its whitespace is kept verbatim.
+Adding a format means
+registering a class here - chat_completions does not change.
+
+    @register_format("myformat")
+    class MyFormat(StreamFormat):
+        def delta(self, text, is_last):
+            return b"data: " + escape_text(text) + b"\\n\\n"
+"""
+
+import re
+
+from .metrics import observe_stream
+from .sse_frames import (
+    DONE_FRAME, AnthropicFrames, GeminiFrames, NDJSONFrames, OpenAIFrames,
+    TextDeltaFrames, simple_json_frame
+)
+
+DEFAULT_FORMAT = "openai"
+FALLBACK_FORMAT = "simple"  # unknown ?format= values have always meant "simple"
+
+_WORD = re.compile(r"\S+")
+
+_FORMATS = {}
+
+
+def register_format(name):
+    """Class decorator adding a StreamFormat under the given ?format= name."""
+    def decorator(cls):
+        cls.name = name
+        _FORMATS[name] = cls
+        return cls
+    return decorator
+
+
+def get_stream_format(name):
+    """Return the StreamFormat class for name, falling back to "simple"."""
+    return _FORMATS.get(name or DEFAULT_FORMAT, _FORMATS[FALLBACK_FORMAT])
+
+
+def available_formats():
+    return list(_FORMATS)
+
+
+def iter_chunks(content, chunk_size=10):
+    """Lazily yield chunk_size-word chunks of content without splitting it up front."""
+    words = []
+    for match in _WORD.finditer(content):
+        words.append(match.group())
+        if len(words) == chunk_size:
+            yield " ".join(words)
+            words = []
+    if words:
+        yield " ".join(words)
+
+
+def _with_last(chunks):
+    """Yield (chunk, is_last) pairs using one chunk of lookahead."""
+    it = iter(chunks)
+    try:
+        prev = next(it)
+    except StopIteration:
+        return
+    for chunk in it:
+        yield prev, False
+        prev = chunk
+    yield prev, True
+
+
+class StreamFormat:
+    """Base plugin: one instance per stream, producing bytes frames."""
+
+    name = None
+    mimetype = "text/event-stream"
+    separator = " "  # set per stream from the chunk source
+    buffered = False  # True when every delta is held for finish()
+
+    def __init__(self, model):
+        self.model = model
+
+    def start(self):
+        return b""
+
+    def delta(self, text, is_last):
+        raise NotImplementedError
+
+    def finish(self, finish_reason):
+        return b""
+
+
+@register_format("openai")
+class OpenAIFormat(StreamFormat):
+    """OpenAI-compatible chat.completion.chunk SSE (the default)."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._frames = OpenAIFrames(model)
+
+    def delta(self, text, is_last):
+        return self._frames.delta(text if is_last else text + self.separator)
+
+    def finish(self, finish_reason):
+        return self._frames.finish(finish_reason) + DONE_FRAME
+
+
+@register_format("textdelta")
+class TextDeltaFormat(StreamFormat):
+    """AI SDK text-delta events."""
+
+    _frames = TextDeltaFrames()
+
+    def start(self):
+        return TextDeltaFrames.START
+
+    def delta(self, text, is_last):
+        return self._frames.delta(text + self.separator)
+
+    def finish(self, finish_reason):
+        return TextDeltaFrames.END
+
+
+@register_format("ndjson")
+class NDJSONFormat(StreamFormat):
+    """Newline-delimited JSON objects."""
+
+    _frames = NDJSONFrames()
+
+    def delta(self, text, is_last):
+        return self._frames.delta(text if is_last else text + self.separator)
+
+    def finish(self, finish_reason):
+        return NDJSONFrames.DONE
+
+
+@register_format("simple")
+class SimpleJSONFormat(StreamFormat):
+    """The whole output in a single frame (buffers until the end)."""
+
+    buffered = True
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._parts = []
+
+    def delta(self, text, is_last):
+        self._parts.append(text)
+        return b""
+
+    def finish(self, finish_reason):
+        return simple_json_frame(self.separator.join(self._parts)) + DONE_FRAME
+
+
+@register_format("anthropic")
+class AnthropicFormat(StreamFormat):
+    """Anthropic Messages API events ending in message_delta/message_stop."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._frames = AnthropicFrames(model)
+        self._output_tokens = 0
+
+    def start(self):
+        return self._frames.start_events
+
+    def delta(self, text, is_last):
+        self._output_tokens += len(text.split())
+        return self._frames.delta(text if is_last else text + self.separator)
+
+    def finish(self, finish_reason):
+        return self._frames.finish(finish_reason, self._output_tokens)
+
+
+@register_format("gemini")
+class GeminiFormat(StreamFormat):
+    """Gemini streamGenerateContent?alt=sse candidates."""
+
+    _frames = GeminiFrames()
+
+    def delta(self, text, is_last):
+        return self._frames.delta(text if is_last else text + self.separator)
+
+    def finish(self, finish_reason):
+        return self._frames.finish(finish_reason)
+
+
+def as_chunks(content):
+    """Word chunks for a finished string; any other chunk source unchanged."""
+    return iter_chunks(content) if isinstance(content, str) else content
+
+
+def _chunks_for(fmt, content):
+    # Nothing is sent before finish(), so chunking a finished string only loses its whitespace
+    if fmt.buffered and isinstance(content, str):
+        return iter((content,))
+    return as_chunks(content)
+
+
+def stream_frames(fmt, content, pacer=None):
+    """Yield bytes frames for content using fmt, pacing after each delta frame."""
+    chunks = _chunks_for(fmt, content)
+    fmt.separator = getattr(chunks, "separator", " ")
+    with observe_stream(fmt.name) as tally:
+        head = fmt.start()
+        if head:
+            yield head
+        for chunk, is_last in _with_last(chunks):
+            frame = fmt.delta(chunk, is_last)
+            if frame:
+                tally.frames += 1
+                yield frame
+                if pacer:
+                    pacer.wait(chunk)
+        yield fmt.finish(getattr(chunks, "finish_reason", "stop"))
+
+
+async def astream_frames(fmt, content, pacer=None):
+    """Async twin of stream_frames that awaits pacing instead of sleeping."""
+    chunks = _chunks_for(fmt, content)
+    fmt.separator = getattr(chunks, "separator", " ")
+    with observe_stream(fmt.name) as tally:
+        head = fmt.start()
+        if head:
+            yield head
+        for chunk, is_last in _with_last(chunks):
+            frame = fmt.delta(chunk, is_last)
+            if frame:
+                tally.frames += 1
+                yield frame
+                if pacer:
+                    await pacer.async_wait(chunk)
+        yield fmt.finish(getattr(chunks, "finish_reason", "stop"))
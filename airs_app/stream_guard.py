@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Incremental response scanning for streamed completions.
+
+Without a guard the streaming apps scan the whole LLM response before the
+first chunk goes out, so time-to-first-token includes a full scan. The
+StreamGuard wraps the chunk iterator instead: chunks flow to the client
+immediately while the text emitted so far is scanned in the background
+every N words or at sentence boundaries. If a scan comes back with a block
+verdict the stream is cut with a block notice and finish_reason becomes
+"content_filter". A final scan of the full text always runs before the
+stream closes. A checkpoint scan shed by admission control is skipped (the
+final scan covers its text); if the final scan is shed the stream is cut,
+since the response was never verified.
+
+Configuration (environment variables):
+    AIRS_STREAM_GUARD          - "true" to scan while streaming (default false)
+    AIRS_STREAM_GUARD_WORDS    - words between checkpoint scans (default 20)
+    AIRS_STREAM_GUARD_WORKERS  - threads for background scans (default 16)
+"""
+
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .admission import Overloaded
+from .request_log import log_event
+from .responses import BLOCKED_RESPONSE
+
+STREAM_GUARD_ENABLED = os.getenv("AIRS_STREAM_GUARD", "false").lower() == "true"
+STREAM_GUARD_WORDS = int(os.getenv("AIRS_STREAM_GUARD_WORDS", "20"))
+STREAM_GUARD_WORKERS = int(os.getenv("AIRS_STREAM_GUARD_WORKERS", "16"))
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s*$")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=STREAM_GUARD_WORKERS,
+                    thread_name_prefix="stream-guard"
+                )
+    return _executor
+
+
+def _blocks(verdict):
+    return verdict.get("action") == "block"
+
+
+class StreamGuard:
+    """
+    Iterate over response chunks while scanning them in growing windows.
+
+    scan is called with the response text emitted so far and must return a
+    scan verdict dict (for example a closure over scan_with_runtime_security).
+    At most one checkpoint scan is in flight at a time; checkpoints reached
+    while one is running are covered by the next one or by the final scan.
+    """
+
+    def __init__(self, chunks, scan, window_words=STREAM_GUARD_WORDS):
+        self._chunks = chunks
+        self.separator = getattr(chunks, "separator", " ")
+        self._scan = scan
+        self._window_words = window_words
+        self._emitted = []
+        self._words_since_scan = 0
+        self._in_flight = None
+        self._scanned_len = 0
+        self.finish_reason = "stop"
+        self.blocked = False
+        self.scans = 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._check(wait=False):
+                yield self._notice()
+                return
+            yield chunk
+            self._emitted.append(chunk)
+            self._words_since_scan += len(chunk.split())
+            if (self._words_since_scan >= self._window_words
+                    or _SENTENCE_END.search(chunk)):
+                self._start_scan()
+
+        # Everything has been emitted; the full text must pass before we close
+        if self._check(wait=True):
+            yield self._notice()
+            return
+        if self._scanned_len < len(self._emitted):
+            self._start_scan()
+            if self._check(wait=True, final=True):
+                yield self._notice()
+                return
+        self.finish_reason = getattr(self._chunks, "finish_reason", "stop")
+
+    def _notice(self):
+        # Token streams have no separator; start the notice on its own line
+        return BLOCKED_RESPONSE if self.separator else "\n" + BLOCKED_RESPONSE
+
+    def _start_scan(self):
+        if self._in_flight is not None and not self._in_flight.done():
+            return
+        if self._check(wait=False):
+            return
+        self._words_since_scan = 0
+        self._scanned_len = len(self._emitted)
+        self.scans += 1
+        # Run in the request's context so the scan keeps its trace ID
+        self._in_flight = _get_executor().submit(contextvars.copy_context().run,
+                                                 self._scan, self.separator.join(self._emitted))
+
+    def _check(self, wait, final=False):
+        """Return True (and mark the stream blocked) once a scan says block."""
+        if self.blocked:
+            return True
+        future = self._in_flight
+        if future is None or (not wait and not future.done()):
+            return False
+        self._in_flight = None
+        try:
+            verdict = future.result()
+        except Overloaded as e:
+            if not final:
+                self._scanned_len = 0  # leave this window to the final scan
+                return False
+            log_event("request.shed", "warning", upstream=e.upstream, reason=e.reason, stage="stream")
+            verdict = {"action": "block"}
+        if _blocks(verdict):
+            log_event("request.blocked", "warning", stage="stream")
+            self.blocked = True
+            self.finish_reason = "content_filter"
+        return self.blocked
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Module-level app for WSGI/ASGI servers, built from AIRS_APP_PROFILE.
+
+    AIRS_APP_PROFILE=standard gunicorn airs_app.wsgi:app
+"""
+
+from . import create_app
+
+app = create_app()
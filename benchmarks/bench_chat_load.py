@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Load generator and latency benchmark for /v1/chat/completions.
+
+Drives the chat endpoint in non-streaming mode and in each streaming
+?format= at a fixed concurrency (closed loop) or a fixed request rate (open
+loop), then reports per mode:
+
+    latency p50/p95/p99   - request start to last byte
+    TTFB p50/p95          - request start to first body byte
+    frames/sec            - stream frames received per second of wall time
+    error rate            - transport errors and non-2xx responses
+
+With no --url the app is started in-process and pointed at mock_airs.py,
+the local stand-in for the Runtime Security scan API, so no API key or
+network access is needed. Scan errors injected with --airs-error-rate are
+retried and then fail open in the app, so they show up as latency.
+--llm-tps puts mock_llm.py behind the app as its upstream LLM, so streams
+carry real token-by-token timing instead of a finished mock string.
+In open-loop mode latency is measured from each request's scheduled start,
+so a backed-up server shows up as latency instead of silently lowering the
+offered load.
+Every request sends the same prompt, so the verdict cache is switched off
+by default (and bypassed per request with --url) to keep every request
+scanned; pass --cache to measure cache hits instead.
+
+Results can be saved as JSON and compared against an earlier run:
+
+    python benchmarks/bench_chat_load.py --out before.json
+    python benchmarks/bench_chat_load.py --compare before.json
+
+Usage:
+    python benchmarks/bench_chat_load.py [--app streaming]
+        [--url http://host:port] [--modes nonstream,openai,ndjson]
+        [--requests 200] [--concurrency 10 | --rps 50] [--pace none] [--cache]
+        [--airs-latency none] [--llm-tps 0 --llm-ttft 0 --llm-tokens 60]
+        [--out results.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mock_airs  # noqa: E402
+import mock_llm  # noqa: E402
+
+# Same header name as airs_app.scan_cache.CACHE_BYPASS_HEADER; not imported so
+# --url runs don't load the app package
+CACHE_BYPASS_HEADER = "X-AIRS-Cache"
+
+DEFAULT_MODES = "nonstream,openai,textdelta,ndjson,simple,anthropic,gemini"
+PROMPT = "Summarize the benefits of unit testing in a few sentences."
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(profile_name, airs_url, cache=False):
+    """Build an app profile, point it at airs_url and serve it on a free port."""
+    os.environ["AIRS_CACHE_ENABLED"] = "true" if cache else "false"
+    os.environ.setdefault("PANW_AI_SEC_API_KEY", "bench-local-key")
+    os.environ["AIRS_API_URL"] = airs_url
+    os.environ.setdefault("AIRS_LOG_FILE", os.devnull)  # logs are still formatted, just not shown
+    from airs_app import create_app, get_profile
+    profile = get_profile(profile_name)
+    app = create_app(profile)
+    port = _free_port()
+
+    if profile.server == "aiohttp":
+        from aiohttp import web
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+_local = threading.local()
+
+
+def _session():
+    # One keep-alive connection per client thread, like a real Red Team client
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def one_request(base_url, mode, pace, prompt, cache, scheduled=None):
+    """Send one chat request; returns a sample dict."""
+    stream = mode != "nonstream"
+    params = {"format": mode} if stream else {}
+    if pace:
+        params["pace"] = pace
+    body = {"model": "bench", "messages": [{"role": "user", "content": prompt}], "stream": stream}
+    headers = {} if cache else {CACHE_BYPASS_HEADER: "bypass"}
+
+    start = scheduled if scheduled is not None else time.perf_counter()
+    sample = {"status": None, "latency": None, "ttfb": None, "frames": 0, "bytes": 0, "error": None}
+    try:
+        with _session().post(f"{base_url}/v1/chat/completions", params=params, json=body, headers=headers,
+                             stream=True, timeout=60) as resp:
+            sample["status"] = resp.status_code
+            data = bytearray()
+            for piece in resp.iter_content(chunk_size=None):
+                if sample["ttfb"] is None and piece:
+                    sample["ttfb"] = time.perf_counter() - start
+                data += piece
+            sample["latency"] = time.perf_counter() - start
+            sample["bytes"] = len(data)
+            if stream:
+                # SSE events end in a blank line; NDJSON objects in a newline
+                sample["frames"] = data.count(b"\n\n") or data.count(b"\n")
+        if not 200 <= sample["status"] < 300:
+            sample["error"] = f"HTTP {sample['status']}"
+    except requests.exceptions.RequestException as e:
+        sample["latency"] = time.perf_counter() - start
+        sample["error"] = type(e).__name__
+    return sample
+
+
+def run_mode(base_url, mode, args):
+    """Run args.requests requests for one mode; returns (samples, wall seconds)."""
+    work = (base_url, mode, args.pace, args.prompt, args.cache)
+    workers = args.concurrency if not args.rps else max(args.concurrency, 64)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(min(args.warmup, args.requests)):
+            one_request(*work)
+
+        started = time.perf_counter()
+        if args.rps:
+            # Open loop: submit on a fixed schedule whether or not earlier requests finished
+            futures = []
+            for i in range(args.requests):
+                due = started + i / args.rps
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(one_request, *work, scheduled=due))
+            samples = [f.result() for f in futures]
+        else:
+            # Closed loop: each worker sends its next request as soon as the last one finishes
+            remaining = iter(range(args.requests))
+            lock = threading.Lock()
+
+            def worker():
+                out = []
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return out
+                    out.append(one_request(*work))
+
+            samples = [s for f in [pool.submit(worker) for _ in range(workers)] for s in f.result()]
+        wall = time.perf_counter() - started
+    return samples, wall
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(samples, wall):
+    ok = [s for s in samples if s["error"] is None]
+    latencies = [s["latency"] * 1000 for s in ok]
+    ttfbs = [s["ttfb"] * 1000 for s in ok if s["ttfb"] is not None]
+    frames = sum(s["frames"] for s in ok)
+    errors = {}
+    for s in samples:
+        if s["error"]:
+            errors[s["error"]] = errors.get(s["error"], 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "error_rate": sum(errors.values()) / len(samples) if samples else 0.0,
+        "error_kinds": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "latency_ms": {f"p{p}": _round(percentile(latencies, p)) for p in (50, 95, 99)},
+        "ttfb_ms": {f"p{p}": _round(percentile(ttfbs, p)) for p in (50, 95, 99)},
+        "frames_per_response": round(frames / len(ok), 1) if ok else 0.0,
+        "frames_per_sec": round(frames / wall, 1) if wall else 0.0,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_table(results):
+    print(f"{'mode':10} {'reqs':>6} {'err%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'ttfb50':>8} {'ttfb95':>8} {'frames/s':>9}")
+    for mode, r in results.items():
+        lat, ttfb = r["latency_ms"], r["ttfb_ms"]
+        print(f"{mode:10} {r['requests']:6d} {r['error_rate'] * 100:6.1f} {r['throughput_rps']:8.1f} "
+              f"{_fmt(lat['p50']):>8} {_fmt(lat['p95']):>8} {_fmt(lat['p99']):>8} "
+              f"{_fmt(ttfb['p50']):>8} {_fmt(ttfb['p95']):>8} {r['frames_per_sec']:9.1f}")
+    print("(latency and TTFB in ms)")
+
+
+def print_comparison(results, baseline_file):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline_file} ({baseline.get('timestamp', 'unknown time')})")
+    print(f"{'mode':10} {'p50':>16} {'p95':>16} {'p99':>16} {'rps':>16}")
+    for mode, r in results.items():
+        old = baseline.get("results", {}).get(mode)
+        if not old:
+            print(f"{mode:10} (not in baseline)")
+            continue
+        cells = [_delta(old["latency_ms"][p], r["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        cells.append(_delta(old["throughput_rps"], r["throughput_rps"]))
+        print(f"{mode:10} " + " ".join(f"{c:>16}" for c in cells))
+
+
+def _delta(old, new):
+    if old is None or new is None:
+        return "-"
+    change = (new - old) / old * 100 if old else 0.0
+    return f"{new:.1f} ({change:+.0f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default="streaming",
+                        help="app profile to start in-process (ignored with --url)")
+    parser.add_argument("--url", help="benchmark an already running app instead")
+    parser.add_argument("--modes", default=DEFAULT_MODES,
+                        help="comma-separated ?format= values; 'nonstream' for stream=false")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per mode")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per mode")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent clients (closed loop)")
+    parser.add_argument("--rps", type=float, help="fixed request rate instead (open loop)")
+    parser.add_argument("--pace", help="?pace= spec sent with streaming requests")
+    parser.add_argument("--prompt", default=PROMPT)
+    parser.add_argument("--cache", action="store_true",
+                        help="leave the verdict cache on so repeated prompts are cache hits (default: every request is scanned)")
+    parser.add_argument("--airs-latency", default="none",
+                        help="mock_airs.py latency spec for the in-process scan API, e.g. lognormal:40,0.5")
+    parser.add_argument("--airs-error-rate", type=float, default=0.0,
+                        help="fraction of scans the in-process scan API fails")
+    parser.add_argument("--llm-tps", type=float,
+                        help="serve the LLM from an in-process mock_llm.py at this many tokens/s (0 = unpaced)")
+    parser.add_argument("--llm-ttft", type=float, default=0.0, help="mock LLM delay before the first token (ms)")
+    parser.add_argument("--llm-tokens", type=int, default=60, help="mock LLM tokens per completion")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    quiet = io.StringIO()
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        _, airs_url = mock_airs.start_server(latency=args.airs_latency, error_rate=args.airs_error_rate,
+                                             rate_limit=0, rules_file="")
+        if args.llm_tps is not None:
+            _, llm_url = mock_llm.start_server(ttft_ms=args.llm_ttft, tps=args.llm_tps,
+                                               tokens=args.llm_tokens, error_rate=0)
+            os.environ.update(OPENAI_API_KEY="bench-local-key", LLM_API_URL=llm_url)
+        with contextlib.redirect_stdout(quiet):
+            base_url = start_app(args.app, airs_url, args.cache)
+
+    load = f"{args.rps:g} req/s (open loop)" if args.rps else f"{args.concurrency} clients (closed loop)"
+    print("=" * 60)
+    print("🏋️  Chat endpoint load benchmark")
+    print("=" * 60)
+    print(f"Target:   {base_url}" + ("" if args.url else f" ({args.app}, mock AIRS latency {args.airs_latency})"))
+    if args.llm_tps is not None and not args.url:
+        print(f"LLM:      mock_llm.py, {args.llm_tokens} tokens at {args.llm_tps:g} tok/s, TTFT {args.llm_ttft:g} ms")
+    print(f"Load:     {load}, {args.requests} requests per mode")
+    print(f"Pacing:   {args.pace or 'app default'}")
+    print(f"Cache:    {'on' if args.cache else 'off'}")
+    print("=" * 60)
+
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        # The apps print per request; keep that out of the report
+        with contextlib.redirect_stdout(quiet):
+            samples, wall = run_mode(base_url, mode, args)
+        quiet.seek(0)
+        quiet.truncate()
+        results[mode] = summarize(samples, wall)
+        r = results[mode]
+        print(f"✅ {mode:10} {r['requests']} requests in {r['wall_s']:.2f}s, {r['errors']} errors")
+
+    print()
+    print_table(results)
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    if args.out:
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "target": args.url or args.app,
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
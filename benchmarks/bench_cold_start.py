@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: process start to first served chat request.
+
+Each run copies the app into a fresh directory (no __pycache__, like a new
+container instance), launches it as a separate process and sends a chat
+request until one is answered. Variants are interleaved run by run:
+
+    baseline  - no precompiled bytecode, AIRS_FAST_START=false
+    bytecode  - compileall run beforehand, AIRS_FAST_START=false
+    fast      - compileall and AIRS_FAST_START=true (as in Dockerfile.cloudrun)
+
+The startup phases each run reported under "startup" in /health are
+summarised too. With no --airs-url the app talks to mock_airs.py on
+localhost, so there is no DNS/TLS handshake for the prewarm to hide; point
+--airs-url at the real service (with PANW_AI_SEC_API_KEY set) to include it.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--profile cloudrun] [--runs 5]
+        [--server gunicorn|dev] [--airs-url URL] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import mock_airs  # noqa: E402
+
+PROMPT = "Summarize the benefits of unit testing in a few sentences."
+PHASES = ("interpreter", "modules", "app", "prewarm", "ready", "first_request")
+VARIANTS = {
+    "baseline": {"compile": False, "fast_start": False},
+    "bytecode": {"compile": True, "fast_start": False},
+    "fast": {"compile": True, "fast_start": True},
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _copy_app(dest):
+    ignore = shutil.ignore_patterns("__pycache__")
+    shutil.copytree(os.path.join(ROOT, "airs_app"), os.path.join(dest, "airs_app"), ignore=ignore)
+    shutil.copy(os.path.join(ROOT, "serve.py"), dest)
+
+
+def cold_start(variant, args, airs_url):
+    """Launch one fresh app process; return ms to the first answered chat request."""
+    settings = VARIANTS[variant]
+    port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="airs-cold-") as workdir:
+        _copy_app(workdir)
+        if settings["compile"]:
+            subprocess.run([sys.executable, "-m", "compileall", "-q", workdir], check=True)
+
+        env = dict(os.environ,
+                   PORT=str(port),
+                   AIRS_API_URL=airs_url,
+                   AIRS_FAST_START="true" if settings["fast_start"] else "false",
+                   AIRS_LOG_FILE=os.devnull)
+        env.setdefault("PANW_AI_SEC_API_KEY", "bench-local-key")
+        env.pop("AIRS_PROCESS_START", None)
+        if args.server == "gunicorn":
+            cmd = [sys.executable, "serve.py", args.profile, "--workers", "1"]
+        else:
+            cmd = [sys.executable, "-m", "airs_app", args.profile]
+
+        url = f"http://127.0.0.1:{port}"
+        body = {"messages": [{"role": "user", "content": PROMPT}]}
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            elapsed = None
+            while time.perf_counter() - start < args.timeout:
+                try:
+                    resp = requests.post(f"{url}/v1/chat/completions", json=body, timeout=args.timeout)
+                    if resp.status_code == 200:
+                        elapsed = (time.perf_counter() - start) * 1000
+                        break
+                except requests.exceptions.ConnectionError:
+                    pass
+                if proc.poll() is not None:
+                    raise RuntimeError(f"app exited with status {proc.returncode}")
+                time.sleep(0.005)
+            if elapsed is None:
+                raise RuntimeError(f"no answer within {args.timeout}s")
+            phases = requests.get(f"{url}/health", timeout=5).json().get("startup", {})
+        finally:
+            proc.send_signal(signal.SIGINT)  # gunicorn's quick shutdown
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return elapsed, phases
+
+
+def summarize(samples):
+    totals = [ms for ms, _ in samples]
+    phases = {}
+    for phase in PHASES:
+        values = [p[f"{phase}_ms"] for _, p in samples if f"{phase}_ms" in p]
+        if values:
+            phases[phase] = round(statistics.median(values), 1)
+    return {
+        "runs": len(totals),
+        "first_response_ms": {
+            "p50": round(statistics.median(totals), 1),
+            "min": round(min(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "phases_ms_p50": phases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", default="cloudrun", help="app profile to start")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per variant")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="comma-separated variants")
+    parser.add_argument("--server", choices=("gunicorn", "dev"), default="gunicorn",
+                        help="serve.py (gunicorn, one worker) or python -m airs_app")
+    parser.add_argument("--airs-url", help="scan API base URL (default: in-process mock_airs.py)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait per start")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    airs_url = args.airs_url
+    if not airs_url:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, airs_url = mock_airs.start_server(latency="none", error_rate=0.0,
+                                                 rate_limit=0, rules_file="")
+
+    print("=" * 60)
+    print("🧊 Cold start: process start to first served request")
+    print("=" * 60)
+    print(f"Profile:  {args.profile} ({args.server})")
+    print(f"AIRS:     {airs_url}")
+    print(f"Runs:     {args.runs} per variant")
+    print("=" * 60)
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    samples = {variant: [] for variant in variants}
+    for _ in range(args.runs):
+        # Interleaved so drift on a busy machine hits every variant alike
+        for variant in variants:
+            samples[variant].append(cold_start(variant, args, airs_url))
+    results = {variant: summarize(samples[variant]) for variant in variants}
+    for variant, r in results.items():
+        print(f"✅ {variant:9} {r['runs']} starts")
+
+    print()
+    print(f"{'variant':10} {'p50':>8} {'min':>8} {'max':>8}   " + " ".join(f"{p:>13}" for p in PHASES))
+    for variant, r in results.items():
+        total = r["first_response_ms"]
+        cells = " ".join(f"{r['phases_ms_p50'].get(p, '-'):>13}" for p in PHASES)
+        print(f"{variant:10} {total['p50']:8.1f} {total['min']:8.1f} {total['max']:8.1f}   {cells}")
+    print("(ms from process start; phases are medians of the app's own startup report)")
+
+    if args.out:
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
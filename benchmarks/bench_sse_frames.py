@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-frame cost of the precompiled SSE encoders.
+
+Compares the old approach (rebuild the chunk dict, json.dumps it and call
+datetime.now() for every frame) against sse_frames.OpenAIFrames, and checks
+both produce identical bytes. No API credentials needed.
+
+Usage:
+    python benchmarks/bench_sse_frames.py [--frames 200000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from airs_app.sse_frames import NDJSONFrames, OpenAIFrames  # noqa: E402
+
+MODEL_NAME = "gpt-4o-mini"
+CHUNK_ID = "chatcmpl-00000000-0000-0000-0000-000000000000"
+DELTA = "This is a safe streaming response to your "
+
+
+def legacy_openai_frame(text):
+    """One frame exactly as generate_openai_stream used to build it."""
+    delta = {
+        "id": CHUNK_ID,
+        "object": "chat.completion.chunk",
+        "created": int(datetime.now().timestamp()),
+        "model": MODEL_NAME,
+        "choices": [{
+            "index": 0,
+            "delta": {
+                "content": text
+            },
+            "finish_reason": None
+        }]
+    }
+    return f"data: {json.dumps(delta)}\n\n".encode("utf-8")
+
+
+def legacy_ndjson_frame(text):
+    obj = {
+        "type": "text-delta",
+        "id": "0",
+        "delta": text
+    }
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+def per_frame_ns(fn, frames):
+    return min(timeit.repeat(lambda: fn(DELTA), number=frames, repeat=5)) / frames * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200000, help="frames per timing run")
+    args = parser.parse_args()
+
+    openai = OpenAIFrames(MODEL_NAME, chunk_id=CHUNK_ID, created=datetime.now().timestamp())
+    ndjson = NDJSONFrames()
+
+    for text in (DELTA, 'quotes " and \\ slashes', "unicode ⛔ ✅ ünïcödé", "new\nline\t"):
+        assert openai.delta(text) == legacy_openai_frame(text), text
+        assert ndjson.delta(text) == legacy_ndjson_frame(text), text
+
+    print("=" * 60)
+    print(f"SSE frame encoding ({args.frames:,} frames per run, best of 5)")
+    print("=" * 60)
+    for name, legacy, fast in (
+        ("openai", legacy_openai_frame, openai.delta),
+        ("ndjson", legacy_ndjson_frame, ndjson.delta),
+    ):
+        old_ns = per_frame_ns(legacy, args.frames)
+        new_ns = per_frame_ns(fast, args.frames)
+        print(f"{name:8} dict+json.dumps: {old_ns:8.0f} ns/frame   "
+              f"precompiled: {new_ns:6.0f} ns/frame   ({old_ns / new_ns:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Prisma AIRS Runtime Security scan API.
+
+Lets the test apps and benchmarks run offline: point an app at it with
+AIRS_API_URL=http://localhost:8900 (any PANW_AI_SEC_API_KEY value works)
+and it answers like the real service.
+
+    POST /v1/scan/sync/request     - one verdict per call
+    POST /v1/scan/async/request    - batch of {"req_id", "scan_req"} items
+    GET  /v1/scan/results          - ?scan_ids=<id,...> (pending until the
+                                     simulated latency has passed)
+    GET  /stats                    - request/outcome counters and request bytes
+
+Verdicts come from regex rules matched against each prompt and response.
+A matching rule sets its detection flag in prompt_detected or
+response_detected and marks the scan "malicious"; rules with action
+"block" also make the action "block". The built-in rules cover common
+prompt injection and data leak phrasings; AIRS_MOCK_RULES replaces them
+with a JSON list such as:
+
+    [{"name": "injection", "pattern": "ignore (all )?previous instructions",
+      "field": "prompt", "detection": "injection", "action": "block"}]
+
+Latency specs (per request):
+    none                 - answer immediately (default)
+    fixed:<ms>
+    uniform:<lo>-<hi>    - milliseconds, uniformly distributed
+    normal:<mean>,<sd>   - clipped at 0
+    lognormal:<median>,<sigma>  - long tail like a real network service
+
+Configuration (environment variables; CLI flags win):
+    AIRS_MOCK_PORT        - listen port (default 8900)
+    AIRS_MOCK_LATENCY     - latency spec (default "none")
+    AIRS_MOCK_ERROR_RATE  - fraction of requests answered with HTTP 500/503 (default 0)
+    AIRS_MOCK_RATE_LIMIT  - requests per second before HTTP 429, 0 = unlimited (default 0)
+    AIRS_MOCK_RULES       - JSON rules file replacing the built-in rules
+
+Usage:
+    python mock_airs.py [--port 8900] [--latency lognormal:40,0.5]
+        [--error-rate 0.01] [--rate-limit 500] [--rules rules.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_PORT = int(os.getenv("AIRS_MOCK_PORT", "8900"))
+MOCK_LATENCY = os.getenv("AIRS_MOCK_LATENCY", "none")
+MOCK_ERROR_RATE = float(os.getenv("AIRS_MOCK_ERROR_RATE", "0"))
+MOCK_RATE_LIMIT = float(os.getenv("AIRS_MOCK_RATE_LIMIT", "0"))
+MOCK_RULES = os.getenv("AIRS_MOCK_RULES", "")
+
+PROMPT_DETECTIONS = ("url_cats", "dlp", "injection", "toxic_content", "malicious_code",
+                     "agent", "topic_violation")
+RESPONSE_DETECTIONS = ("url_cats", "dlp", "db_security", "toxic_content", "malicious_code",
+                       "ungrounded", "topic_violation")
+
+DEFAULT_RULES = [
+    {"name": "prompt-injection", "field": "prompt", "detection": "injection", "action": "block",
+     "pattern": r"ignore (all |any )?(previous|prior|above) (instructions|prompts?)"
+                r"|disregard (your|the) (rules|instructions)|system prompt|jailbreak|\bDAN\b"},
+    {"name": "malicious-code", "field": "any", "detection": "malicious_code", "action": "block",
+     "pattern": r"rm -rf /|reverse shell|keylogger|ransomware"},
+    {"name": "toxic", "field": "any", "detection": "toxic_content", "action": "block",
+     "pattern": r"\b(kill|hurt) (yourself|someone)\b|build a bomb"},
+    {"name": "data-leak", "field": "any", "detection": "dlp", "action": "block",
+     "pattern": r"\b\d{3}-\d{2}-\d{4}\b|\b(?:\d[ -]?){15,16}\b|api[_ -]?key\s*[:=]|password\s*[:=]"},
+    {"name": "bad-url", "field": "any", "detection": "url_cats", "action": "alert",
+     "pattern": r"https?://[^\s]*(malware|phish)"},
+]
+
+MAX_STORED_RESULTS = 10000
+
+
+class Rule:
+    def __init__(self, name, pattern, field="any", detection="injection", action="block"):
+        if field not in ("prompt", "response", "any"):
+            raise ValueError(f"rule {name}: field must be prompt, response or any")
+        self.name = name
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.field = field
+        self.detection = detection
+        self.action = action
+
+
+def load_rules(path=None):
+    if not path:
+        return [Rule(**r) for r in DEFAULT_RULES]
+    with open(path) as f:
+        return [Rule(**r) for r in json.load(f)]
+
+
+def parse_latency(spec):
+    """Return a function producing one delay in seconds for a latency spec."""
+    mode, _, value = (spec or "none").strip().lower().partition(":")
+    if mode == "none":
+        return lambda: 0.0
+    if mode == "fixed":
+        ms = float(value)
+        return lambda: ms / 1000
+    if mode == "uniform":
+        lo, hi = (float(v) for v in value.split("-"))
+        return lambda: random.uniform(lo, hi) / 1000
+    if mode == "normal":
+        mean, sd = (float(v) for v in value.split(","))
+        return lambda: max(random.gauss(mean, sd), 0.0) / 1000
+    if mode == "lognormal":
+        median, sigma = (float(v) for v in value.split(","))
+        mu = math.log(median)
+        return lambda: random.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"unknown latency spec: {spec}")
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts up to one second's worth."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ScanEmulator:
+    """Verdicts, latency, errors and rate limiting shared by all handler threads."""
+
+    def __init__(self, rules, latency="none", error_rate=0.0, rate_limit=0.0):
+        self.rules = rules
+        self.latency_spec = latency
+        self.delay = parse_latency(latency)
+        self.error_rate = error_rate
+        self.limiter = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self.results = OrderedDict()  # scan_id -> (ready_at, items)
+        self.counts = {"requests": 0, "bytes_in": 0, "scans": 0, "allowed": 0, "blocked": 0,
+                       "malicious": 0, "errors": 0, "rate_limited": 0, "unauthorized": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def verdict(self, scan_req):
+        """Scan result for one scan request body."""
+        prompt_detected = dict.fromkeys(PROMPT_DETECTIONS, False)
+        response_detected = dict.fromkeys(RESPONSE_DETECTIONS, False)
+        block = matched = False
+        for content in scan_req.get("contents") or [{}]:
+            for field, detected in (("prompt", prompt_detected), ("response", response_detected)):
+                text = content.get(field)
+                if not text:
+                    continue
+                for rule in self.rules:
+                    if rule.field in (field, "any") and rule.regex.search(text):
+                        detected[rule.detection] = True
+                        matched = True
+                        block = block or rule.action == "block"
+
+        self.count("scans")
+        self.count("blocked" if block else "allowed")
+        if matched:
+            self.count("malicious")
+        profile = scan_req.get("ai_profile", {}).get("profile_name", "default")
+        scan_id = str(uuid.uuid4())
+        return {
+            "report_id": f"R{scan_id}",
+            "scan_id": scan_id,
+            "tr_id": scan_req.get("tr_id"),
+            "profile_id": str(uuid.uuid5(uuid.NAMESPACE_DNS, profile)),
+            "profile_name": profile,
+            "category": "malicious" if matched else "benign",
+            "action": "block" if block else "allow",
+            "prompt_detected": prompt_detected,
+            "response_detected": response_detected,
+        }
+
+    def store(self, items, ready_at):
+        scan_id = str(uuid.uuid4())
+        with self._lock:
+            self.results[scan_id] = (ready_at, items)
+            while len(self.results) > MAX_STORED_RESULTS:
+                self.results.popitem(last=False)
+        return scan_id
+
+    def lookup(self, scan_ids):
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for scan_id in scan_ids:
+                ready_at, items = self.results.get(scan_id, (None, []))
+                for item in items:
+                    if now >= ready_at:
+                        out.append(dict(item, scan_id=scan_id, status="complete"))
+                    else:
+                        out.append({"req_id": item["req_id"], "scan_id": scan_id, "status": "pending"})
+        return out
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, latency=self.latency_spec, error_rate=self.error_rate,
+                        rate_limit=self.limiter.rate if self.limiter else 0,
+                        rules=[r.name for r in self.rules])
+
+
+class ScanHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+    emulator = None
+
+    def _send(self, status, obj, headers=None):
+        out = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _admit(self):
+        """Apply auth, rate limiting and injected errors; False if already answered."""
+        emu = self.emulator
+        emu.count("requests")
+        if not self.headers.get("x-pan-token"):
+            emu.count("unauthorized")
+            self._send(401, {"error": {"message": "Not Authenticated"}})
+            return False
+        if emu.limiter and not emu.limiter.take():
+            emu.count("rate_limited")
+            self._send(429, {"error": {"message": "Too Many Requests"}}, {"Retry-After": "1"})
+            return False
+        if emu.error_rate and random.random() < emu.error_rate:
+            emu.count("errors")
+            status = random.choice((500, 503))
+            self._send(status, {"error": {"message": "Injected error"}})
+            return False
+        return True
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.emulator.count("bytes_in", length)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError:
+            return self._send(400, {"error": {"message": "Invalid JSON"}})
+        if not self._admit():
+            return
+        emu = self.emulator
+
+        if self.path.startswith("/v1/scan/sync/request"):
+            delay = emu.delay()
+            if delay:
+                time.sleep(delay)
+            return self._send(200, emu.verdict(body))
+
+        if self.path.startswith("/v1/scan/async/request"):
+            if not isinstance(body, list):
+                return self._send(400, {"error": {"message": "Expected a list of scan requests"}})
+            items = [{"req_id": item.get("req_id"), "result": emu.verdict(item.get("scan_req", {}))}
+                     for item in body]
+            # The batch completes after one simulated scan latency
+            scan_id = emu.store(items, time.monotonic() + emu.delay())
+            return self._send(200, {"received": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                                    "scan_id": scan_id, "report_id": f"R{scan_id}"})
+
+        self._send(404, {"error": {"message": "Not Found"}})
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path == "/stats":
+            return self._send(200, self.emulator.stats())
+        if url.path == "/v1/scan/results":
+            if not self._admit():
+                return
+            query = urllib.parse.parse_qs(url.query)
+            scan_ids = [s for s in query.get("scan_ids", [""])[0].split(",") if s]
+            return self._send(200, self.emulator.lookup(scan_ids))
+        self._send(404, {"error": {"message": "Not Found"}})
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is routine under load
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def start_server(port=0, host="127.0.0.1", latency=MOCK_LATENCY, error_rate=MOCK_ERROR_RATE,
+                 rate_limit=MOCK_RATE_LIMIT, rules_file=MOCK_RULES):
+    """Start the emulator on a background thread; returns (server, base_url)."""
+    handler = type("Handler", (ScanHandler,), {
+        "emulator": ScanEmulator(load_rules(rules_file), latency, error_rate, rate_limit)
+    })
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Prisma AIRS scan API emulator.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=MOCK_PORT)
+    parser.add_argument("--latency", default=MOCK_LATENCY, help="latency spec, e.g. lognormal:40,0.5")
+    parser.add_argument("--error-rate", type=float, default=MOCK_ERROR_RATE)
+    parser.add_argument("--rate-limit", type=float, default=MOCK_RATE_LIMIT, help="requests/sec, 0 = unlimited")
+    parser.add_argument("--rules", default=MOCK_RULES, help="JSON rules file")
+    args = parser.parse_args()
+
+    try:
+        parse_latency(args.latency)
+        rules = load_rules(args.rules)
+    except (ValueError, TypeError, OSError, re.error) as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+
+    print("=" * 60)
+    print("🧪 Mock AIRS scan API")
+    print("=" * 60)
+    print(f"Listen:      http://{args.host}:{args.port}")
+    print(f"Latency:     {args.latency}")
+    print(f"Error rate:  {args.error_rate:.1%}")
+    print(f"Rate limit:  {f'{args.rate_limit:g} req/s' if args.rate_limit else 'unlimited'}")
+    print(f"Rules:       {', '.join(r.name for r in rules)}")
+    print("=" * 60)
+    print(f"\nPoint an app at it:  AIRS_API_URL=http://localhost:{args.port} "
+          f"PANW_AI_SEC_API_KEY=local python runtime_test_app_streaming.py\n")
+
+    server, _ = start_server(args.port, args.host, args.latency, args.error_rate,
+                             args.rate_limit, args.rules)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
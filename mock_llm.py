@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible LLM server for offline tests.
+
+Serves POST /v1/chat/completions (streaming and non-streaming) and
+GET /v1/models. Streams are sent as real chat.completion.chunk SSE events
+over HTTP/1.1 chunked encoding with keep-alive, one token (word) per event,
+so the apps' pooled upstream client and token passthrough can be exercised
+without an API key:
+
+    python mock_llm.py --port 8901 --ttft 200 --tps 40
+    OPENAI_API_KEY=local LLM_API_URL=http://localhost:8901/v1 \\
+        PANW_AI_SEC_API_KEY=local python runtime_test_app_streaming.py
+
+Configuration (environment variables; CLI flags win):
+    MOCK_LLM_PORT        - listen port (default 8901)
+    MOCK_LLM_TTFT_MS     - delay before the first token (default 0)
+    MOCK_LLM_TPS         - tokens per second after that, 0 = no delay (default 0)
+    MOCK_LLM_TOKENS      - tokens per completion (default 60)
+    MOCK_LLM_ERROR_RATE  - fraction of requests answered with HTTP 500 (default 0)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_PORT = int(os.getenv("MOCK_LLM_PORT", "8901"))
+MOCK_TTFT_MS = float(os.getenv("MOCK_LLM_TTFT_MS", "0"))
+MOCK_TPS = float(os.getenv("MOCK_LLM_TPS", "0"))
+MOCK_TOKENS = int(os.getenv("MOCK_LLM_TOKENS", "60"))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+
+FILLER = ("Security testing helps teams find weaknesses before attackers do, and runtime "
+          "scanning adds a layer that checks every prompt and response as it happens. ").split()
+
+
+def completion_tokens(prompt, count):
+    """Deterministic reply for a prompt, split into tokens with leading spaces."""
+    words = f"Mock completion for: {prompt[:40]}".split()
+    while len(words) < count:
+        words.extend(FILLER)
+    words = words[:count]
+    return [words[0]] + [" " + w for w in words[1:]]
+
+
+class LLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ttft = 0.0
+    tps = 0.0
+    tokens = 60
+    error_rate = 0.0
+
+    def _send_json(self, status, obj):
+        out = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.startswith("/v1/models"):
+            return self._send_json(200, {"object": "list", "data": [
+                {"id": "mock-llm", "object": "model", "owned_by": "local"}]})
+        self._send_json(404, {"error": {"message": "Not Found"}})
+
+    def do_POST(self):
+        if not self.path.startswith("/v1/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not Found"}})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON"}})
+        if self.error_rate and random.random() < self.error_rate:
+            return self._send_json(500, {"error": {"message": "Injected error"}})
+
+        messages = body.get("messages") or [{}]
+        prompt = str(messages[-1].get("content", ""))
+        model = body.get("model", "mock-llm")
+        limit = min(int(body.get("max_tokens") or self.tokens), self.tokens)
+        tokens = completion_tokens(prompt, limit)
+        finish_reason = "length" if limit < self.tokens else "stop"
+        chunk_id = f"chatcmpl-{uuid.uuid4()}"
+        created = int(time.time())
+
+        if self.ttft:
+            time.sleep(self.ttft)
+
+        if not body.get("stream"):
+            if self.tps:
+                time.sleep(len(tokens) / self.tps)
+            return self._send_json(200, {
+                "id": chunk_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens),
+                          "total_tokens": len(prompt.split()) + len(tokens)}
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        first = dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                     "finish_reason": None}])
+        self._write_chunk(b"data: " + json.dumps(first).encode() + b"\n\n")
+        next_at = time.monotonic()
+        for token in tokens:
+            if self.tps:
+                next_at += 1 / self.tps
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            event = dict(base, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+            self._write_chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+        last = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        self._write_chunk(b"data: " + json.dumps(last).encode() + b"\n\ndata: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is routine under load
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def start_server(port=0, host="127.0.0.1", ttft_ms=MOCK_TTFT_MS, tps=MOCK_TPS,
+                 tokens=MOCK_TOKENS, error_rate=MOCK_ERROR_RATE):
+    """Start the mock LLM on a background thread; returns (server, /v1 base URL)."""
+    handler = type("Handler", (LLMHandler,), {
+        "ttft": ttft_ms / 1000, "tps": tps, "tokens": tokens, "error_rate": error_rate
+    })
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=MOCK_PORT)
+    parser.add_argument("--ttft", type=float, default=MOCK_TTFT_MS, help="ms before the first token")
+    parser.add_argument("--tps", type=float, default=MOCK_TPS, help="tokens per second, 0 = no delay")
+    parser.add_argument("--tokens", type=int, default=MOCK_TOKENS, help="tokens per completion")
+    parser.add_argument("--error-rate", type=float, default=MOCK_ERROR_RATE)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🤖 Mock OpenAI-compatible LLM")
+    print("=" * 60)
+    print(f"Listen:      http://{args.host}:{args.port}/v1")
+    print(f"TTFT:        {args.ttft:g} ms")
+    print(f"Rate:        {f'{args.tps:g} tokens/s' if args.tps else 'unpaced'}")
+    print(f"Tokens:      {args.tokens} per completion")
+    print(f"Error rate:  {args.error_rate:.1%}")
+    print("=" * 60)
+
+    server, _ = start_server(args.port, args.host, args.ttft, args.tps, args.tokens, args.error_rate)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Async (asyncio/aiohttp) test application for high-concurrency Red Teaming.
+
+Requires: pip install aiohttp
+
+Kept as an entry point; the code lives in the airs_app package as the
+"async" profile (see airs_app/__init__.py).
+"""
+
+from airs_app import create_app, run
+
+app = create_app("async")
+
+if __name__ == "__main__":
+    run("async", app)
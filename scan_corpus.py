@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Offline batch scanning of a prompt corpus.
+
+Runs a JSONL or CSV file of prompts (optionally with responses) through the
+same scan path as the apps - pooled session, verdict cache, admission
+control, circuit breaker and, with --batch, the async batch API - without
+going through HTTP, and writes one verdict per row to JSONL or Parquet.
+
+The input is streamed and at most --window rows are in flight, so memory
+stays flat however large the corpus is. Verdicts are written in input
+order; every --checkpoint-every rows the output is flushed to disk and
+<output>.checkpoint.json records how far it got. After a crash or Ctrl-C,
+--resume skips the rows already written and carries on.
+
+A row whose scan fails (category "error": API errors, an open circuit
+breaker, AIRS_FAIL_MODE=closed) is retried with backoff up to
+--error-retries times. If it still fails the run stops there: the
+checkpoint covers only the rows before it, nothing is written for it, and
+the exit status is 2, so --resume picks up at that row once the API is
+back. Rows with an empty prompt are written as category "skipped".
+
+Input rows:
+    JSONL  - {"id": ..., "prompt": ..., "response": ...} or a bare JSON string
+    CSV    - header row with prompt (and optionally id, response) columns
+Field names can be changed with --prompt-field, --response-field, --id-field.
+
+Output (JSONL, or Parquet with --format parquet or a .parquet path):
+    row, id, prompt, category, action, blocked, prompt_detected,
+    response_detected, error, latency_ms
+Parquet output is a directory of part files, one per checkpoint, which
+pyarrow, pandas and DuckDB read as a single dataset (pip install pyarrow).
+
+Scan events are logged to <output>.log unless AIRS_LOG_FILE is set.
+
+Usage:
+    python scan_corpus.py prompts.jsonl verdicts.jsonl [--workers 16] [--batch]
+    python scan_corpus.py prompts.csv verdicts.parquet --resume
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_rows(path, prompt_field="prompt", response_field="response", id_field="id"):
+    """Yield (row_number, id, prompt, response) from a JSONL or CSV file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for row, record in enumerate(records):
+            if isinstance(record, str):
+                record = {prompt_field: record}
+            yield (row, record.get(id_field, row), record.get(prompt_field) or "",
+                   record.get(response_field) or None)
+
+
+class JsonlWriter:
+    """Appends JSON lines; the checkpoint holds the byte offset to resume from."""
+
+    def __init__(self, path, resume_state=None):
+        self.path = path
+        mode = "r+b" if resume_state else "wb"
+        self._file = open(path, mode)
+        if resume_state:
+            self._file.truncate(resume_state["output_bytes"])
+            self._file.seek(resume_state["output_bytes"])
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def checkpoint(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"output_bytes": self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes one part file per checkpoint into a dataset directory."""
+
+    def __init__(self, path, resume_state=None):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ ERROR: Parquet output needs pyarrow\n   Run: pip install pyarrow")
+        self.path = path
+        self.parts = resume_state["parts"] if resume_state else 0
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            # Parts written after the last checkpoint are redone
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+        self._rows = []
+
+    def write(self, record):
+        self._rows.append(record)
+
+    def checkpoint(self):
+        if self._rows:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            detected = pa.list_(pa.string())
+            schema = pa.schema([("row", pa.int64()), ("id", pa.string()), ("prompt", pa.string()),
+                                ("category", pa.string()), ("action", pa.string()),
+                                ("blocked", pa.bool_()), ("prompt_detected", detected),
+                                ("response_detected", detected), ("error", pa.string()),
+                                ("latency_ms", pa.float64())])
+            rows = [dict(r, id=str(r["id"])) for r in self._rows]
+            table = pa.Table.from_pylist(rows, schema=schema)
+            pq.write_table(table, os.path.join(self.path, f"part-{self.parts:05d}.parquet"))
+            self.parts += 1
+            self._rows = []
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def _checkpoint_path(output):
+    return output.rstrip("/") + ".checkpoint.json"
+
+
+def load_checkpoint(output):
+    try:
+        with open(_checkpoint_path(output)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(output, state):
+    path = _checkpoint_path(output)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+class ScanFailed(Exception):
+    """A row kept failing to scan; the run stops before writing it."""
+
+    def __init__(self, row, error):
+        self.row = row
+        self.error = error
+        super().__init__(f"row {row}: {error}")
+
+
+def _detected(flags):
+    return sorted(k for k, v in (flags or {}).items() if v)
+
+
+class CorpusScanner:
+    """Scans rows on a thread pool and hands verdicts back in input order."""
+
+    def __init__(self, scan, workers, window, error_retries=3):
+        self.scan = scan
+        self.window = window
+        self.error_retries = error_retries
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="corpus-scan")
+        self.counts = {"rows": 0, "blocked": 0, "malicious": 0, "skipped": 0,
+                       "shed_retries": 0, "error_retries": 0}
+        self._lock = threading.Lock()  # retries are counted on the scan threads
+
+    def _retry(self, counter, delay):
+        with self._lock:
+            self.counts[counter] += 1
+        time.sleep(delay)
+
+    def _scan_row(self, row, row_id, prompt, response):
+        from airs_app.admission import Overloaded
+        from airs_app.request_log import start_trace
+
+        # The row's trace ID becomes the scan's tr_id in the AIRS report
+        start_trace(f"corpus-{row}")
+        start = time.perf_counter()
+        failures = 0
+        while True:
+            if not prompt:
+                result = {"category": "skipped", "action": "allow", "error": "empty prompt"}
+                break
+            try:
+                result = self.scan(prompt, response)
+            except Overloaded as e:
+                # Offline there is no client to push back on; wait our turn
+                self._retry("shed_retries", min(e.retry_after, 5))
+                continue
+            if result.get("category") != "error":
+                break
+            # A failed scan is not a verdict; never write it as one
+            failures += 1
+            if failures > self.error_retries:
+                raise ScanFailed(row, result.get("error") or "scan failed")
+            self._retry("error_retries", min(2 ** (failures - 1), 30))
+        action = result.get("action", "unknown")
+        return {
+            "row": row,
+            "id": row_id,
+            "prompt": prompt,
+            "category": result.get("category", "unknown"),
+            "action": action,
+            "blocked": result.get("category") == "malicious" or action == "block",
+            "prompt_detected": _detected(result.get("prompt_detected")),
+            "response_detected": _detected(result.get("response_detected")),
+            "error": result.get("error"),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def run(self, rows, stop):
+        """Yield verdict records in row order until rows run out or stop is set."""
+        pending = deque()
+        for item in rows:
+            if stop.is_set():
+                break
+            pending.append(self.pool.submit(self._scan_row, *item))
+            while len(pending) >= self.window or (pending and pending[0].done()):
+                yield self._tally(pending.popleft().result())
+        while pending:
+            yield self._tally(pending.popleft().result())
+
+    def _tally(self, record):
+        with self._lock:
+            self.counts["rows"] += 1
+            self.counts["blocked"] += record["blocked"]
+            self.counts["malicious"] += record["category"] == "malicious"
+            self.counts["skipped"] += record["category"] == "skipped"
+        return record
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a prompt corpus offline.")
+    parser.add_argument("input", help="JSONL or CSV prompt file")
+    parser.add_argument("output", help="verdict file (.jsonl) or Parquet dataset directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"),
+                        help="output format (default: from the output name)")
+    parser.add_argument("--workers", type=int, default=16, help="scan threads (default 16)")
+    parser.add_argument("--window", type=int, default=0,
+                        help="max rows in flight (default 4 x workers)")
+    parser.add_argument("--batch", action="store_true",
+                        help="coalesce scans into async batch requests (AIRS_BATCH=true)")
+    parser.add_argument("--error-retries", type=int, default=3,
+                        help="retries for a failed scan before the run stops (default 3)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="rows per checkpoint")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing output")
+    parser.add_argument("--limit", type=int, default=0, help="stop after N rows (0 = all)")
+    parser.add_argument("--prompt-field", default="prompt")
+    parser.add_argument("--response-field", default="response")
+    parser.add_argument("--id-field", default="id")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.rstrip("/").endswith(".parquet") else "jsonl")
+    state = load_checkpoint(args.output) if args.resume else None
+    if args.resume and state is None:
+        print(f"❌ ERROR: no checkpoint for {args.output}; run without --resume", file=sys.stderr)
+        return 1
+    if state is None and os.path.exists(args.output) and not args.overwrite:
+        print(f"❌ ERROR: {args.output} exists; use --resume or --overwrite", file=sys.stderr)
+        return 1
+
+    # Configure the shared scan path before it is imported
+    if args.batch:
+        os.environ["AIRS_BATCH"] = "true"
+    os.environ.setdefault("AIRS_LOG_FILE", args.output.rstrip("/") + ".log")
+    from airs_app.config import get_profile, require_api_key
+    from airs_app.scanner import get_scan_client, set_security_profile
+
+    require_api_key()
+    set_security_profile(get_profile("standard").security_profile)
+
+    done = state["rows_done"] if state else 0
+    writer = (ParquetWriter if fmt == "parquet" else JsonlWriter)(args.output, state)
+    # Scanned in line even for an alert-only profile: queued jobs would never
+    # drain once this process exits
+    scanner = CorpusScanner(get_scan_client().scan_now, args.workers,
+                            args.window or args.workers * 4, args.error_retries)
+    if state:
+        scanner.counts.update(state.get("counts", {}))
+
+    rows = read_rows(args.input, args.prompt_field, args.response_field, args.id_field)
+    for _ in range(done):
+        next(rows, None)
+    if args.limit:
+        # Stop reading the input once the limit is reached
+        rows = itertools.islice(rows, max(args.limit - done, 0))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    print("=" * 60, file=sys.stderr)
+    print("🔎 Corpus scan", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    print(f"Input:    {args.input}" + (f" (resuming at row {done})" if done else ""), file=sys.stderr)
+    print(f"Output:   {args.output} ({fmt})", file=sys.stderr)
+    print(f"Workers:  {args.workers} threads, {scanner.window} rows in flight"
+          + (", batched" if args.batch else ""), file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+
+    started = time.monotonic()
+    first_row = done
+    since_checkpoint = 0
+
+    def checkpoint():
+        save_checkpoint(args.output, dict(writer.checkpoint(), input=os.path.abspath(args.input),
+                                          format=fmt, rows_done=done, counts=scanner.snapshot()))
+
+    failed = None
+    try:
+        for record in scanner.run(rows, stop):
+            writer.write(record)
+            done += 1
+            since_checkpoint += 1
+            if since_checkpoint >= args.checkpoint_every:
+                checkpoint()
+                since_checkpoint = 0
+                rate = (done - first_row) / max(time.monotonic() - started, 1e-9)
+                print(f"   {done} rows  {rate:.0f}/s  blocked {scanner.counts['blocked']}"
+                      f"  scan retries {scanner.counts['error_retries']}", file=sys.stderr)
+    except ScanFailed as e:
+        failed = e
+    finally:
+        # Everything written so far is in row order, so it is safe to checkpoint
+        checkpoint()
+        writer.close()
+        scanner.pool.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.monotonic() - started
+    counts = scanner.counts
+    print("=" * 60, file=sys.stderr)
+    if failed:
+        print(f"❌ Scan failed at row {failed.row} after {args.error_retries} retries: {failed.error}",
+              file=sys.stderr)
+    print(f"{'⏸️  Stopped' if stop.is_set() or failed else '✅ Done'}: {done} rows"
+          f" ({(done - first_row) / max(elapsed, 1e-9):.0f} rows/s this run)", file=sys.stderr)
+    print(f"Blocked:  {counts['blocked']}   Malicious: {counts['malicious']}"
+          f"   Skipped: {counts['skipped']}   Scan retries: {counts['error_retries']}", file=sys.stderr)
+    if stop.is_set() or failed:
+        print(f"Resume:   python scan_corpus.py {args.input} {args.output} --resume", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    if failed:
+        return 2
+    return 130 if stop.is_set() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
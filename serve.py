@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the test applications.
+
+Running an app file directly starts Flask's single-process development
+server. This launcher serves the same app with gunicorn instead: several
+worker processes, a thread pool per worker for the blocking Flask apps (or
+aiohttp's event-loop worker for the async app), keep-alive tuning and
+graceful shutdown on SIGTERM. Concurrency is sized from the CPUs actually
+available to the container (cgroup quota, then CPU affinity) and the port
+comes from $PORT, so the same command works locally, in Docker and on
+Cloud Run.
+
+Usage:
+    python serve.py [profile] [--workers N] [--threads N] [--dry-run]
+
+The profile is one of standard, streaming, cloudrun or async (see
+airs_app/config.py); the old app module names are still accepted.
+
+Configuration (environment variables; CLI flags win):
+    PORT                    - listen port (default: the profile's, 5000 or 8080)
+    SERVE_APP               - profile when none is given (default: $AIRS_APP_PROFILE or streaming)
+    WEB_CONCURRENCY         - worker processes (default: sized from CPUs); set for the
+                              workers too, which split the admission limits by it
+    SERVE_THREADS           - threads per worker for Flask apps (default 8)
+    SERVE_KEEPALIVE         - seconds to keep idle client connections open (default 75)
+    SERVE_TIMEOUT           - seconds before a silent worker is restarted (default 120)
+    SERVE_GRACEFUL_TIMEOUT  - seconds to finish in-flight requests on shutdown (default 25)
+    SERVE_MAX_REQUESTS      - recycle a worker after N requests, 0 = never (default 0)
+
+Requires: pip install gunicorn
+"""
+
+import argparse
+import math
+import os
+import sys
+
+WORKER_CLASSES = {
+    "flask": "gthread",
+    "aiohttp": "aiohttp.GunicornWebWorker",
+}
+
+
+def available_cpus():
+    """CPUs this process may use, honouring cgroup quotas (Cloud Run, Docker --cpus)."""
+    quota = None
+    try:
+        # cgroup v2: "max 100000" or "200000 100000"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    if quota:
+        cpus = min(cpus, max(math.ceil(quota), 1))
+    return cpus
+
+
+def plan(profile, workers=None, threads=None):
+    """Work out the gunicorn settings for an app profile and where each came from."""
+    kind = profile.server
+    cpus = available_cpus()
+
+    if workers is None and os.getenv("WEB_CONCURRENCY"):
+        workers = int(os.getenv("WEB_CONCURRENCY"))
+        workers_from = "WEB_CONCURRENCY"
+    elif workers is None:
+        # Flask workers block on scans/LLM calls, so oversubscribe CPUs;
+        # one event loop per CPU is enough for the async app.
+        workers = cpus * 2 + 1 if kind == "flask" else cpus
+        workers_from = f"{cpus} CPU(s)"
+    else:
+        workers_from = "--workers"
+
+    if kind == "flask":
+        threads = threads or int(os.getenv("SERVE_THREADS", "8"))
+    else:
+        threads = 1
+
+    return {
+        "kind": kind,
+        "cpus": cpus,
+        "workers_from": workers_from,
+        "options": {
+            "bind": f"0.0.0.0:{profile.port}",
+            "workers": workers,
+            "threads": threads,
+            "worker_class": WORKER_CLASSES[kind],
+            "keepalive": int(os.getenv("SERVE_KEEPALIVE", "75")),
+            "timeout": int(os.getenv("SERVE_TIMEOUT", "120")),
+            "graceful_timeout": int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "25")),
+            "max_requests": int(os.getenv("SERVE_MAX_REQUESTS", "0")),
+            "max_requests_jitter": int(os.getenv("SERVE_MAX_REQUESTS", "0")) // 10,
+            # Apps start background threads lazily or at import; they must be
+            # created inside each worker, not in the master before fork.
+            "preload_app": False,
+            "accesslog": None,
+            "errorlog": "-",
+        },
+    }
+
+
+def report(profile, settings):
+    from airs_app.startup import FAST_START
+
+    opts = settings["options"]
+    concurrency = opts["workers"] * opts["threads"]
+    print("=" * 60)
+    print("🚀 Production server (gunicorn)")
+    print("=" * 60)
+    print(f"App profile:      {profile.name} ({settings['kind']})")
+    print(f"Listen:           {opts['bind']}")
+    print(f"CPUs available:   {settings['cpus']}")
+    print(f"Workers:          {opts['workers']} (from {settings['workers_from']})")
+    print(f"Worker class:     {opts['worker_class']}")
+    if settings["kind"] == "flask":
+        print(f"Threads/worker:   {opts['threads']}")
+        print(f"Max concurrency:  {concurrency} requests")
+    else:
+        print("Max concurrency:  event loop per worker (connection-bound)")
+    print(f"Keep-alive:       {opts['keepalive']}s")
+    print(f"Graceful stop:    {opts['graceful_timeout']}s (SIGTERM)")
+    print(f"Fast start:       {'on (AIRS connection prewarmed)' if FAST_START else 'off'}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a test app with gunicorn.")
+    parser.add_argument("profile", nargs="?", default=os.getenv("SERVE_APP"),
+                        help="app profile (default: $SERVE_APP, $AIRS_APP_PROFILE or streaming)")
+    parser.add_argument("--workers", type=int, help="worker processes")
+    parser.add_argument("--threads", type=int, help="threads per Flask worker")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan and exit")
+    args = parser.parse_args()
+
+    from airs_app import get_profile, startup
+
+    # Workers report startup phases from the launcher's start (see airs_app/startup.py)
+    os.environ.setdefault(startup.START_ENV, repr(startup.PROCESS_START))
+    try:
+        profile = get_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    settings = plan(profile, args.workers, args.threads)
+    report(profile, settings)
+    if args.dry_run:
+        return 0
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ ERROR: gunicorn not installed")
+        print("   Run: pip install gunicorn")
+        return 1
+
+    # Admission limits (AIRS_SCAN_RATE, ...) are per process; each worker takes its share
+    os.environ["WEB_CONCURRENCY"] = str(settings["options"]["workers"])
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in settings["options"].items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Built in each worker (preload_app is off)
+            from airs_app import create_app
+            return create_app(profile)
+
+    Server().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -24,7 +24,7 @@ ngrok config add-authtoken $NGROK_AUTHTOKEN
 
 # Start Flask app in background
 echo "🚀 Starting Flask application..."
-python runtime_test_app_direct_api.py &
+python serve.py standard &
 APP_PID=$!
 
 # Wait for Flask to be ready
@@ -2,28 +2,35 @@
 """
 Quick verification that BLOCK_STATUS_CODE is properly configured in all apps.
 This doesn't require API credentials - just checks the code is correct.
+
+The Flask profiles (standard, streaming, cloudrun) share airs_app/flask_app.py
+and read the setting from airs_app/config.py.
 """
 
 import os
 import re
 
-def check_file(filepath):
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def check_file(filepath, config_path, streaming):
     """Check if file has correct BLOCK_STATUS_CODE implementation."""
-    print(f"\nChecking {os.path.basename(filepath)}...")
+    print(f"\nChecking {os.path.relpath(filepath, HERE)}...")
 
     with open(filepath, 'r') as f:
         content = f.read()
+    with open(config_path, 'r') as f:
+        config = f.read()
 
     # Check 1: Variable defined in config section
     config_pattern = r'BLOCK_STATUS_CODE\s*=\s*int\(os\.getenv\("BLOCK_STATUS_CODE",\s*"200"\)\)'
-    has_config = bool(re.search(config_pattern, content))
+    has_config = bool(re.search(config_pattern, config))
 
     # Check 2: Used in blocked response
     usage_pattern = r'\),\s*BLOCK_STATUS_CODE'
     has_usage = bool(re.search(usage_pattern, content))
 
     # Check 3: For streaming files, check Response() usage
-    if 'streaming' in filepath:
+    if streaming:
         streaming_pattern = r'status=BLOCK_STATUS_CODE'
         has_streaming = bool(re.search(streaming_pattern, content))
     else:
@@ -53,21 +60,35 @@ def main():
     print("=" * 60)
 
     files_to_check = [
-        "runtime_test_app.py",
-        "runtime_test_app_direct_api.py",
-        "runtime_test_app_streaming.py",
-        "runtime_test_app_streaming_cloudrun.py"
+        # (file, profiles it serves, streaming)
+        ("airs_app/flask_app.py", "standard, streaming, cloudrun", True),
     ]
+    entry_points = {
+        "runtime_test_app.py": "standard",
+        "runtime_test_app_direct_api.py": "standard",
+        "runtime_test_app_streaming.py": "streaming",
+        "runtime_test_app_streaming_cloudrun.py": "cloudrun",
+    }
 
     results = []
-    for filename in files_to_check:
-        filepath = os.path.join(os.path.dirname(__file__), filename)
-        if os.path.exists(filepath):
-            results.append(check_file(filepath))
+    config_path = os.path.join(HERE, "airs_app", "config.py")
+    for filename, profiles, streaming in files_to_check:
+        filepath = os.path.join(HERE, filename)
+        if os.path.exists(filepath) and os.path.exists(config_path):
+            print(f"\n({profiles})", end="")
+            results.append(check_file(filepath, config_path, streaming))
         else:
             print(f"\n⚠️  {filename} not found")
             results.append(False)
 
+    # The entry points must still build one of those profiles
+    print("\nChecking entry points...")
+    for filename, profile in entry_points.items():
+        filepath = os.path.join(HERE, filename)
+        found = os.path.exists(filepath) and f'create_app("{profile}")' in open(filepath).read()
+        print(f"  {'✅' if found else '❌'} {filename} -> {profile}")
+        results.append(found)
+
     print("\n" + "=" * 60)
     if all(results):
         print("✅ All files correctly implemented!")